@@ -1,14 +1,18 @@
 from abc import ABC, abstractmethod
-import random
 from typing import TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
     from core.config import SimulationConfig
 
 from core.ant_state import AntState
+from core.rng import streams
 
 
 class Ant(ABC):
+    count = 1
+    # Заполняются планировщиком опасностей: дни следующих событий и события, наступившие сегодня
+    hazard_days = None
+    due_hazards = None
 
     def __init__(
             self,
@@ -23,6 +27,7 @@ class Ant(ABC):
         self.health = 100
         self.hunger = 0
         self.age = 0
+        self.birth_day = 0
         self.state = AntState.ALIVE
         self.diseased = False
         self.injured = False
@@ -31,18 +36,35 @@ class Ant(ABC):
         self.death_day: Optional[int] = None
 
     def try_get_disease(self) -> bool:
-        if random.random() < self.config.disease_chance:
-            self.diseased = True
-            self.health = max(0, self.health - 10)
-            return True
-        return False
+        if self.due_hazards is not None:
+            hit = "disease" in self.due_hazards
+        else:
+            hit = streams.disease.random() < self.config.disease_chance
+        if hit:
+            self._catch_disease()
+        return hit
 
     def try_get_injury(self) -> bool:
-        if random.random() < self.config.injury_chance:
-            self.injured = True
-            self.health = max(0, self.health - 15)
-            return True
-        return False
+        if self.due_hazards is not None:
+            hit = "injury" in self.due_hazards
+        else:
+            hit = streams.injury.random() < self.config.injury_chance
+        if hit:
+            self._suffer_injury()
+        return hit
+
+    def _catch_disease(self) -> None:
+        self.diseased = True
+        self.health = max(0, self.health - 10)
+
+    def _suffer_injury(self) -> None:
+        self.injured = True
+        self.health = max(0, self.health - 15)
+
+    def _dies_of_old_age(self) -> bool:
+        if self.due_hazards is not None:
+            return "old_age" in self.due_hazards
+        return streams.old_age.random() < self.config.old_age_death_chance
 
     def age_one_step(self, current_day: int = 0) -> None:
         if self.state == AntState.DEAD:
@@ -56,17 +78,21 @@ class Ant(ABC):
             if self.health <= 0:
                 self.die("голод", current_day)
 
-        if self.try_get_disease() and self.health <= 0:
-            self.die("болезнь", current_day)
+        # При планировании опасностей розыгрыш нужен только в дни, когда у муравья есть событие
+        hazards_due = self.due_hazards is None or self.due_hazards
+
+        if hazards_due:
+            if self.try_get_disease() and self.health <= 0:
+                self.die("болезнь", current_day)
 
-        if self.try_get_injury() and self.health <= 0:
-            self.die("травма", current_day)
+            if self.try_get_injury() and self.health <= 0:
+                self.die("травма", current_day)
 
         if self.age >= self.max_age and self.state == AntState.ALIVE:
             self.state = AntState.OLD
 
-        if self.state == AntState.OLD:
-            if random.random() < self.config.old_age_death_chance:
+        if self.state == AntState.OLD and hazards_due:
+            if self._dies_of_old_age():
                 self.die("старость", current_day)
 
         if self.health <= 0 and self.state != AntState.DEAD:
@@ -0,0 +1,123 @@
+import copy
+from typing import List, Optional
+
+from ants.base import Ant
+from ants.soldier import SoldierAnt
+from ants.worker import WorkerAnt
+from core.rng import binomial, streams
+
+
+class AntGroup:
+    # Суперособь: count одинаковых муравьев с общим состоянием, случайные исходы применяются биномиально
+    count: int
+
+    def split_off(self, count: int) -> 'AntGroup':
+        part = copy.copy(self)
+        part.count = count
+        self.count -= count
+        return part
+
+    def expand(self) -> List[Ant]:
+        individual_class = type(self).individual_class
+        members = []
+        for _ in range(self.count):
+            ant = individual_class.__new__(individual_class)
+            ant.__dict__.update(self.__dict__)
+            for name in ("count", "_outcomes", "_old_age_drawn", "hazard_days", "due_hazards"):
+                ant.__dict__.pop(name, None)
+            members.append(ant)
+        return members
+
+    def age_branches(self, current_day: int = 0) -> List['AntGroup']:
+        # Каждая ветка (болезнь, травма, смерть от старости) проигрывает обычный age_one_step
+        # с заранее выбранным исходом, поэтому распределение исходов совпадает с поштучным
+        if not self.is_alive():
+            return [self]
+        before = copy.copy(self)
+        config = self.config
+        parts = []
+        diseased = binomial(streams.disease, self.count, config.disease_chance)
+        for disease, disease_count in ((True, diseased), (False, self.count - diseased)):
+            if not disease_count:
+                continue
+            injured = binomial(streams.injury, disease_count, config.injury_chance)
+            for injury, count in ((True, injured), (False, disease_count - injured)):
+                if not count:
+                    continue
+                part = before._branch(count, disease, injury, False, current_day)
+                if part._old_age_drawn:
+                    old_age_deaths = binomial(streams.old_age, count, config.old_age_death_chance)
+                    if old_age_deaths:
+                        parts.append(before._branch(old_age_deaths, disease, injury, True, current_day))
+                        part.count -= old_age_deaths
+                if part.count:
+                    parts.append(part)
+
+        # Первая ветка остается этим же объектом, чтобы колония могла убрать его из списка по ссылке
+        self.__dict__.update(parts[0].__dict__)
+        parts[0] = self
+        return parts
+
+    def _branch(self, count: int, disease: bool, injury: bool, old_age: bool, current_day: int) -> 'AntGroup':
+        part = copy.copy(self)
+        part.count = count
+        part._outcomes = (disease, injury, old_age)
+        part._old_age_drawn = False
+        part.age_one_step(current_day)
+        return part
+
+    def try_get_disease(self) -> bool:
+        if self._outcomes[0]:
+            self._catch_disease()
+        return self._outcomes[0]
+
+    def try_get_injury(self) -> bool:
+        if self._outcomes[1]:
+            self._suffer_injury()
+        return self._outcomes[1]
+
+    def _dies_of_old_age(self) -> bool:
+        self._old_age_drawn = True
+        return self._outcomes[2]
+
+    def __str__(self) -> str:
+        return f"{self.count} x {super().__str__()}"
+
+
+class WorkerGroup(AntGroup, WorkerAnt):
+    individual_class = WorkerAnt
+
+    def work(self) -> int:
+        if not self.is_alive():
+            return 0
+
+        # Сумма count равномерных величин из {1, 2, 3} через число единиц и двоек
+        ones = binomial(streams.food, self.count, 1 / 3)
+        twos = binomial(streams.food, self.count - ones, 1 / 2)
+        self.food_carried = ones + 2 * twos + 3 * (self.count - ones - twos)
+        print(f"Группа из {self.count} рабочих нашла {self.food_carried} единиц пищи")
+        return self.food_carried
+
+
+class SoldierGroup(AntGroup, SoldierAnt):
+    individual_class = SoldierAnt
+
+
+def group_of(ant: Ant, count: Optional[int] = None) -> AntGroup:
+    group_class = WorkerGroup if isinstance(ant, WorkerAnt) else SoldierGroup
+    group = group_class.__new__(group_class)
+    group.__dict__.update(ant.__dict__)
+    group.__dict__.pop("hazard_days", None)
+    group.__dict__.pop("due_hazards", None)
+    group.count = ant.count if count is None else count
+    return group
+
+
+def head_count(ants) -> int:
+    return sum(ant.count for ant in ants)
+
+
+def state_key(ant: Ant) -> tuple:
+    # Муравьи с одинаковым ключом неразличимы для симуляции и могут объединяться в группу
+    return (getattr(type(ant), "individual_class", type(ant)), ant.age, ant.health, ant.hunger, ant.state,
+            ant.diseased, ant.injured, ant.birth_day, ant.max_age)
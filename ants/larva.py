@@ -1,6 +1,6 @@
-import random
 from ants.base import Ant
 from core.ant_state import AntState
+from core.rng import streams
 
 
 class Larva(Ant):
@@ -22,7 +22,7 @@ class Larva(Ant):
         self._init_future_type_characteristics()
 
     def _determine_future_type(self) -> str:
-        rand = random.random()
+        rand = streams.caste.random()
         if rand < self.config.worker_chance:
             return "worker"
         elif rand < self.config.worker_chance + self.config.soldier_chance:
@@ -74,7 +74,7 @@ class Larva(Ant):
         self.growth_progress += 1
 
         if self.hunger >= self.config.hunger_threshold:
-            if random.random() < self.config.larva_starvation_chance:
+            if streams.larva.random() < self.config.larva_starvation_chance:
                 self.die("голод (личинка)", self.config.current_day if hasattr(self.config, 'current_day') else None)
                 print(f" Личинка (будущий {self.get_future_type_name()}) умерла от голода")
                 return
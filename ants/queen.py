@@ -1,5 +1,5 @@
-import random
 from ants.base import Ant
+from core.rng import streams
 
 class QueenAnt(Ant):
     def __init__(self, config):
@@ -22,8 +22,8 @@ class QueenAnt(Ant):
         if (self.fed_by_workers >= 3 and
                 self.days_since_last_laying >= self.config.queen_egg_laying_interval):
 
-            if random.random() < self.config.queen_egg_laying_chance:
-                eggs_count = random.randint(
+            if streams.eggs.random() < self.config.queen_egg_laying_chance:
+                eggs_count = streams.eggs.randint(
                     self.config.queen_egg_min_count,
                     self.config.queen_egg_max_count
                 )
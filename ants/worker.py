@@ -1,4 +1,4 @@
-import random
+from core.rng import streams
 from ants.base import Ant
 
 
@@ -16,7 +16,7 @@ class WorkerAnt(Ant):
         if not self.is_alive():
             return 0
 
-        self.food_carried = random.randint(1, 3)
+        self.food_carried = streams.food.randint(1, 3)
         print(f"Рабочий нашел {self.food_carried} единиц пищи")
         return self.food_carried
 
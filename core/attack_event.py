@@ -1,15 +1,18 @@
-import random
 from typing import Dict, List
 
+from ants.group import head_count
 from core.events import EventType, ColonyEvent
+from core.rng import binomial, split_draws, streams
 
 
 class AttackEvent(ColonyEvent):
+    ATTACKER_TYPES = ["чужие муравьи", "жуки", "пауки", "грызуны"]
+
     def __init__(self, config):
         super().__init__(EventType.ATTACK, config)
-        self.attacker_types = ["чужие муравьи", "жуки", "пауки", "грызуны"]
-        self.attacker = random.choice(self.attacker_types)
-        self.strength = random.randint(1, 10) * self.severity
+        self.attacker_types = list(self.ATTACKER_TYPES)
+        self.attacker = streams.attack.choice(self.attacker_types)
+        self.strength = streams.attack.randint(1, 10) * self.severity
 
     def execute(self, colony) -> Dict:
         result = {
@@ -19,8 +22,8 @@ class AttackEvent(ColonyEvent):
             "message": ""
         }
 
-        defense_strength = len(colony.soldiers) * 3
-        defense_strength += len(colony.workers) * 0.5
+        defense_strength = head_count(colony.soldiers) * 3
+        defense_strength += head_count(colony.workers) * 0.5
 
         if len(colony.soldiers) == 0:
             defense_strength *= 0.3
@@ -64,11 +67,21 @@ class AttackEvent(ColonyEvent):
         loss_chance = 0.1 + (0.2 * self.severity)
 
         soldiers_to_remove = []
-        for soldier in colony.soldiers:
-            if random.random() < loss_chance:
-                soldier.die("погиб в бою", colony.day)
-                soldiers_to_remove.append(soldier)
-                losses.append(soldier)
+        for soldier in list(colony.soldiers):
+            if soldier.count > 1:
+                killed = binomial(streams.combat, soldier.count, loss_chance)
+                if 0 < killed < soldier.count:
+                    fallen = soldier.split_off(killed)
+                    fallen.die("погиб в бою", colony.day)
+                    losses.append(fallen)
+                    continue
+                if not killed:
+                    continue
+            elif streams.combat.random() >= loss_chance:
+                continue
+            soldier.die("погиб в бою", colony.day)
+            soldiers_to_remove.append(soldier)
+            losses.append(soldier)
 
         for soldier in soldiers_to_remove:
             if soldier in colony.soldiers:
@@ -81,28 +94,39 @@ class AttackEvent(ColonyEvent):
 
         if colony.workers:
             worker_loss_percentage = 0.2 + (0.3 * self.severity)
-            workers_to_lose = int(len(colony.workers) * worker_loss_percentage)
-            workers_to_lose = max(1, min(workers_to_lose, len(colony.workers)))
-
-            workers_to_remove = random.sample(colony.workers, workers_to_lose)
-            for worker in workers_to_remove:
-                worker.die("погиб при атаке", colony.day)
-                losses.append(worker)
-                colony.workers.remove(worker)
+            workers = head_count(colony.workers)
+            workers_to_lose = int(workers * worker_loss_percentage)
+            workers_to_lose = max(1, min(workers_to_lose, workers))
+            losses.extend(self._kill(colony.workers, workers_to_lose, "погиб при атаке", colony.day))
 
         if colony.soldiers:
             soldier_loss_percentage = 0.5 + (0.4 * self.severity)
-            soldiers_to_lose = int(len(colony.soldiers) * soldier_loss_percentage)
-            soldiers_to_lose = max(1, min(soldiers_to_lose, len(colony.soldiers)))
-
-            soldiers_to_remove = random.sample(colony.soldiers, soldiers_to_lose)
-            for soldier in soldiers_to_remove:
-                soldier.die("погиб в бою", colony.day)
-                losses.append(soldier)
-                colony.soldiers.remove(soldier)
+            soldiers = head_count(colony.soldiers)
+            soldiers_to_lose = int(soldiers * soldier_loss_percentage)
+            soldiers_to_lose = max(1, min(soldiers_to_lose, soldiers))
+            losses.extend(self._kill(colony.soldiers, soldiers_to_lose, "погиб в бою", colony.day))
 
         return losses
 
+    @staticmethod
+    def _kill(ants: List, count: int, cause: str, day: int) -> List:
+        if all(ant.count == 1 for ant in ants):
+            victims = streams.combat.sample(ants, count)
+        else:
+            # С группами выбор без возвращения делается по численностям, а не по объектам
+            victims = []
+            for ant, killed in zip(list(ants), split_draws(streams.combat, [ant.count for ant in ants], count)):
+                if killed and killed < ant.count:
+                    victims.append(ant.split_off(killed))
+                elif killed:
+                    victims.append(ant)
+
+        for victim in victims:
+            victim.die(cause, day)
+            if victim in ants:
+                ants.remove(victim)
+        return victims
+
     def get_description(self) -> str:
         strength_desc = (
             "слабая" if self.strength < 3
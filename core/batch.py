@@ -0,0 +1,150 @@
+import contextlib
+import dataclasses
+import itertools
+import json
+import math
+import os
+import random
+from multiprocessing import Pool
+from typing import Dict, Any, List, Optional, Iterable
+
+from core.colony import AntColony
+from core.config import SimulationConfig
+from core.metrics import MetricsExporter
+from core.rng import streams
+
+
+@contextlib.contextmanager
+def quiet_output():
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def apply_overrides(config: SimulationConfig, overrides: Dict[str, Any]) -> SimulationConfig:
+    config = dataclasses.replace(config, **overrides)
+    if error := config.validate():
+        raise ValueError(f"invalid configuration: {error}")
+    return config
+
+
+def seed_simulation(seed: Optional[int]) -> None:
+    random.seed(seed)
+    streams.seed(seed)
+
+
+def colony_outcome(colony: AntColony, seed: Optional[int] = None) -> Dict[str, Any]:
+    stats = colony.get_statistics()
+    return {
+        "seed": seed,
+        "days": colony.day,
+        "collapsed": not colony.is_alive(),
+        "population": stats["population"]["total_live"],
+        "workers": stats["population"]["workers"],
+        "soldiers": stats["population"]["soldiers"],
+        "food": stats["resources"]["food"],
+        "total_deaths": stats["death_statistics"]["total_deaths"],
+        "deaths_by_cause": stats["death_statistics"]["by_cause"],
+        "attacks": stats["events"]["attack_events"],
+    }
+
+
+def run_simulation(config: SimulationConfig, days: int, seed: Optional[int] = None,
+                   metrics: Optional[MetricsExporter] = None) -> Dict[str, Any]:
+    seed_simulation(seed)
+    with quiet_output():
+        colony = AntColony(f"run-{seed}", config, metrics=metrics)
+        for _ in range(days):
+            colony.simulate_day()
+            if not colony.is_alive():
+                break
+    return colony_outcome(colony, seed)
+
+
+def _run_task(task) -> Dict[str, Any]:
+    return run_simulation(*task)
+
+
+def run_ensemble(
+        config: SimulationConfig,
+        days: int,
+        seeds: Iterable[int],
+        processes: Optional[int] = None,
+        metrics: Optional[MetricsExporter] = None
+) -> List[Dict[str, Any]]:
+    tasks = [(config, days, seed) for seed in seeds]
+    if processes == 1 or len(tasks) <= 1:
+        results = []
+        for index, task in enumerate(tasks):
+            if metrics:
+                metrics.set_queue_depth(len(tasks) - index)
+            results.append(run_simulation(*task, metrics=metrics))
+            if metrics:
+                metrics.observe_run(results[-1], include_days=False)
+        if metrics:
+            metrics.set_queue_depth(0)
+        return results
+
+    with Pool(processes) as pool:
+        if not metrics:
+            return pool.map(_run_task, tasks)
+        # Дни считаются в процессах пула, поэтому в родителе учитываются готовые прогоны целиком
+        results = []
+        metrics.set_queue_depth(len(tasks))
+        for result in pool.imap(_run_task, tasks):
+            results.append(result)
+            metrics.observe_run(result)
+            metrics.set_queue_depth(len(tasks) - len(results))
+        return results
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    runs = len(results)
+    if runs == 0:
+        return {
+            "runs": 0, "collapse_rate": 0.0, "mean_population": 0.0,
+            "std_population": 0.0, "mean_food": 0.0, "mean_days": 0.0
+        }
+    mean_population = sum(r["population"] for r in results) / runs
+    return {
+        "runs": runs,
+        "collapse_rate": sum(r["collapsed"] for r in results) / runs,
+        "mean_population": mean_population,
+        "std_population": math.sqrt(sum((r["population"] - mean_population) ** 2 for r in results) / runs),
+        "mean_food": sum(r["food"] for r in results) / runs,
+        "mean_days": sum(r["days"] for r in results) / runs,
+    }
+
+
+def run_sweep(
+        base_config: SimulationConfig,
+        grid: Dict[str, List[Any]],
+        days: int,
+        seeds: Iterable[int],
+        path: Optional[str] = None,
+        processes: Optional[int] = None,
+        metrics: Optional[MetricsExporter] = None
+) -> List[Dict[str, Any]]:
+    seeds = list(seeds)
+    names = list(grid)
+    records = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        overrides = dict(zip(names, values))
+        config = apply_overrides(base_config, overrides)
+        record = {"overrides": overrides, "days": days}
+        record.update(summarize(run_ensemble(config, days, seeds, processes, metrics)))
+        records.append(record)
+        if path:
+            append_sweep_record(path, record)
+    return records
+
+
+def append_sweep_record(path: str, record: Dict[str, Any]) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def load_sweep(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -1,13 +1,19 @@
-import random
 from collections import defaultdict
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
+from ants.group import AntGroup, group_of, state_key
 from ants.larva import Larva
 from ants.queen import QueenAnt
 from ants.soldier import SoldierAnt
 from ants.worker import WorkerAnt
 from core.ant_state import AntState
 from core.attack_event import AttackEvent
+from core.event_store import EventStore
+from core.hazards import HazardScheduler
+from core.journal import EventJournal, death_kind
+from core.life_table import LifeTableWriter
+from core.metrics import MetricsExporter
+from core.rng import streams
 
 
 class DeathStatistics:
@@ -86,9 +92,20 @@ class DeathStatistics:
 
 
 class AntColony:
-    def __init__(self, name: str, config):
+    def __init__(
+            self,
+            name: str,
+            config,
+            journal: Optional[EventJournal] = None,
+            life_table: Optional[LifeTableWriter] = None,
+            metrics: Optional[MetricsExporter] = None,
+            events: Optional[EventStore] = None
+    ):
         self.name = name
         self.config = config
+        self.journal = journal
+        self.life_table = life_table
+        self.metrics = metrics
 
         self.queen = QueenAnt(config)
         self.workers: List[WorkerAnt] = []
@@ -97,13 +114,18 @@ class AntColony:
         self.pupae: List[Larva] = []
 
         self.death_stats = DeathStatistics()
-        self.events_log = []  # НОВОЕ: лог событий
+        self.events_log = events if events is not None else EventStore()
 
         self.food_storage = config.initial_food
         self.day = 0
+        self.grouped = False
+        self.hazards = HazardScheduler(config) if config.hazard_scheduling else None
 
         self._initialize_colony()
 
+        if self.journal:
+            self.journal.start(self)
+
     def _initialize_colony(self) -> None:
         print(f"Создаем колонию '{self.name}'...")
         for _ in range(self.config.initial_workers):
@@ -111,7 +133,21 @@ class AntColony:
 
     def add_larva(self, count: int = 1) -> None:
         for _ in range(count):
-            self.larvae.append(Larva(self.config))
+            larva = Larva(self.config)
+            larva.birth_day = self.day
+            self.larvae.append(larva)
+            if self.journal:
+                self.journal.record_larva(self.day, larva.future_type)
+
+    def _record_death(self, ant, cause: str) -> None:
+        for _ in range(ant.count):
+            self.death_stats.record_death(ant, cause, self.day)
+            if self.journal:
+                self.journal.record_death(self.day, death_kind(ant), getattr(ant, 'future_type', None), cause, ant.age)
+            if self.life_table:
+                self.life_table.record(ant, self.day, cause)
+            if self.metrics:
+                self.metrics.record_death(cause)
 
     def _process_pupae(self) -> None:
         remaining_pupae = []
@@ -120,17 +156,23 @@ class AntColony:
         for pupa in self.pupae:
             if not pupa.is_alive():
                 if pupa.state == AntState.DEAD and pupa.death_cause:
-                    self.death_stats.record_death(pupa, pupa.death_cause, self.day)
+                    self._record_death(pupa, pupa.death_cause)
                 continue
 
             pupa.work()
             pupa.age_one_step(self.day)
 
             if pupa.growth_progress >= self.config.pupa_growth_duration:
+                if self.journal:
+                    self.journal.record_hatch(self.day, pupa.future_type)
                 new_ant = self._create_ant_from_pupa(pupa)
                 if new_ant:
+                    new_ant.birth_day = pupa.birth_day
                     newly_hatched.append(new_ant)
                     print(f"🎉 {new_ant.ant_type} вылупился из куколки!")
+                elif self.life_table:
+                    # Трутни покидают колонию: жизнь цензурируется в день вылета
+                    self.life_table.record(pupa, self.day, None)
             else:
                 remaining_pupae.append(pupa)
 
@@ -176,6 +218,8 @@ class AntColony:
 
         eggs_laid = self.queen.work()
         if eggs_laid > 0:
+            if self.journal:
+                self.journal.record_eggs(self.day, eggs_laid)
             self.add_larva(eggs_laid)
 
         self._process_larvae()
@@ -184,14 +228,21 @@ class AntColony:
 
         self._age_colony()
 
+        self._rebalance_groups()
+
         if self.config.show_detailed_stats:
             self.death_stats.print_daily_deaths(self.day)
 
         self._print_statistics()
 
+        if self.journal:
+            self.journal.end_day(self)
+        if self.metrics:
+            self.metrics.observe_day(self)
+
     def _check_for_events(self) -> None:
         if (self.day >= self.config.min_days_for_attack and
-                random.random() < self.config.attack_chance):
+                streams.attack.random() < self.config.attack_chance):
             attack_event = AttackEvent(self.config)
             self._handle_attack_event(attack_event)
 
@@ -210,7 +261,7 @@ class AntColony:
             ants_by_type = {}
             for ant in result["ants_lost"]:
                 ant_type = ant.ant_type
-                ants_by_type[ant_type] = ants_by_type.get(ant_type, 0) + 1
+                ants_by_type[ant_type] = ants_by_type.get(ant_type, 0) + ant.count
 
             print("Потери среди муравьев:")
             for ant_type, count in ants_by_type.items():
@@ -218,17 +269,19 @@ class AntColony:
 
             for ant in result["ants_lost"]:
                 if ant.death_cause:
-                    self.death_stats.record_death(ant, ant.death_cause, self.day)
+                    self._record_death(ant, ant.death_cause)
 
         event_log = {
             "day": self.day,
             "type": "attack",
             "success": result["success"],
             "food_lost": result["food_lost"],
-            "ants_lost": len(result["ants_lost"]),
+            "ants_lost": sum(ant.count for ant in result["ants_lost"]),
             "description": result["message"]
         }
         self.events_log.append(event_log)
+        if self.journal:
+            self.journal.record_attack(self.day, attack_event, result)
 
         print(f"Солдаты в колонии: {self._count_live_ants(self.soldiers)}")
 
@@ -249,7 +302,7 @@ class AntColony:
         for i, worker in reversed(dead_workers):
             self.workers.pop(i)
             if worker.death_cause:
-                self.death_stats.record_death(worker, worker.death_cause, self.day)
+                self._record_death(worker, worker.death_cause)
             print(f"Рабочий муравей умер (причина: {worker.death_cause})")
 
         self.food_storage += total_food
@@ -271,8 +324,12 @@ class AntColony:
         all_adults = self.workers + self.soldiers
         for ant in all_adults:
             if self.food_storage >= 1 and ant.is_alive():
+                if ant.count > self.food_storage:
+                    # Пищи хватает только на часть группы: ненакормленные отделяются в новую группу
+                    hungry = ant.split_off(ant.count - self.food_storage)
+                    (self.workers if isinstance(ant, WorkerAnt) else self.soldiers).append(hungry)
                 ant.feed(food_amount=10)
-                self.food_storage -= 1
+                self.food_storage -= ant.count
 
     def _process_larvae(self) -> None:
         dead_larvae = []
@@ -291,11 +348,13 @@ class AntColony:
             elif larva.state == AntState.PUPA:
                 dead_larvae.append((i, larva))
                 larvae_to_pupate.append(larva)
+                if self.journal:
+                    self.journal.record_pupation(self.day, larva.future_type)
 
         for i, larva in reversed(dead_larvae):
             self.larvae.pop(i)
             if larva.state == AntState.DEAD and larva.death_cause:
-                self.death_stats.record_death(larva, larva.death_cause, self.day)
+                self._record_death(larva, larva.death_cause)
 
         self.pupae.extend(larvae_to_pupate)
 
@@ -303,20 +362,80 @@ class AntColony:
         was_alive = self.queen.is_alive()
         self.queen.age_one_step(self.day)
         if was_alive and not self.queen.is_alive() and self.queen.death_cause:
-            self.death_stats.record_death(self.queen, self.queen.death_cause, self.day)
+            self._record_death(self.queen, self.queen.death_cause)
+
+        hazards = self.hazards
+        if hazards:
+            # Болезнь, травма и смерть от старости разыгрываются заранее геометрическими ожиданиями,
+            # в день шага розыгрыш нужен только муравьям с наступившим событием
+            hazards.begin_day(self.day)
 
         for ant_list in [self.workers, self.soldiers]:
             dead_ants = []
+            branches = []
             for ant in ant_list:
                 was_alive = ant.is_alive()
-                ant.age_one_step(self.day)
+                if isinstance(ant, AntGroup):
+                    parts = ant.age_branches(self.day)
+                    branches.extend(parts[1:])
+                    for part in parts[1:]:
+                        if was_alive and not part.is_alive() and part.death_cause:
+                            self._record_death(part, part.death_cause)
+                else:
+                    if hazards and ant.due_hazards is None:
+                        hazards.register(ant)
+                    ant.age_one_step(self.day)
                 if was_alive and not ant.is_alive() and ant.death_cause:
-                    self.death_stats.record_death(ant, ant.death_cause, self.day)
+                    self._record_death(ant, ant.death_cause)
                     dead_ants.append(ant)
 
             for dead_ant in dead_ants:
                 if dead_ant in ant_list:
                     ant_list.remove(dead_ant)
+            ant_list.extend(part for part in branches if part.is_alive())
+
+        if hazards:
+            hazards.end_day()
+
+    def _rebalance_groups(self) -> None:
+        threshold = self.config.super_individual_threshold
+        if threshold is None:
+            return
+
+        population = self.get_total_ants()
+        if population >= threshold:
+            self.grouped = True
+        elif self.grouped and population < threshold * self.config.super_individual_split_fraction:
+            # Колония снова мала: группы распадаются на отдельных муравьев с тем же состоянием
+            self.grouped = False
+            for ant_list in [self.workers, self.soldiers]:
+                ant_list[:] = [member for ant in ant_list
+                               for member in (ant.expand() if isinstance(ant, AntGroup) else [ant])]
+            return
+
+        if self.grouped:
+            self.workers = self._merge_identical(self.workers)
+            self.soldiers = self._merge_identical(self.soldiers)
+
+    def _merge_identical(self, ants: List) -> List:
+        # Стоимость дня в режиме групп зависит от числа различных состояний, а не от численности
+        groups = {}
+        for ant in ants:
+            if not ant.is_alive():
+                continue
+            key = state_key(ant)
+            group = groups.get(key)
+            if group is None:
+                groups[key] = ant
+            else:
+                if not isinstance(group, AntGroup):
+                    if self.hazards:
+                        self.hazards.forget(group)
+                    group = groups[key] = group_of(group)
+                if self.hazards:
+                    self.hazards.forget(ant)
+                group.count += ant.count
+        return list(groups.values())
 
     def _print_statistics(self) -> None:
         print(f"\nСтатистика колонии '{self.name}':")
@@ -331,10 +450,9 @@ class AntColony:
         print(f"Всего живых муравьев: {self.get_total_ants()}")
         print(f"Всего смертей: {self.death_stats.total_deaths}")
 
-        if self.events_log:
-            recent_events = [e for e in self.events_log if e["day"] == self.day]
-            if recent_events:
-                print(f"События сегодня: {len(recent_events)}")
+        events_today = self.events_log.count_on_day(self.day)
+        if events_today:
+            print(f"События сегодня: {events_today}")
 
         if self.larvae:
             print(f"\nБудущее поколение личинок:")
@@ -354,7 +472,7 @@ class AntColony:
         return f"будущих рабочих: {stats['worker']}, будущих солдат: {stats['soldier']}"
 
     def _count_live_ants(self, ants_list: List) -> int:
-        return len([ant for ant in ants_list if ant.is_alive()])
+        return sum(ant.count for ant in ants_list if ant.is_alive())
 
     def get_total_ants(self) -> int:
         total = 1 if self.queen.is_alive() else 0
@@ -399,9 +517,9 @@ class AntColony:
 
             "events": {
                 "total_events": len(self.events_log),
-                "attack_events": len([e for e in self.events_log if e["type"] == "attack"]),
-                "successful_defenses": len([e for e in self.events_log if e.get("success", False)]),
-                "recent_events": self.events_log[-5:] if self.events_log else []
+                "attack_events": self.events_log.attacks,
+                "successful_defenses": self.events_log.successful_defenses,
+                "recent_events": self.events_log.recent(5)
             }
         }
 
@@ -421,12 +539,11 @@ class AntColony:
 
         self.death_stats.print_statistics()
 
-        if self.events_log:
+        events = self.events_log
+        if events:
             print(f"\n📊 События колонии:")
-            attack_events = [e for e in self.events_log if e["type"] == "attack"]
-            if attack_events:
-                print(f"  Атак на колонию: {len(attack_events)}")
-                successful = len([e for e in attack_events if e.get("success", False)])
-                print(f"  Успешно отражено: {successful}")
-                print(f"  Потеряно муравьев в атаках: {sum(e.get('ants_lost', 0) for e in attack_events)}")
-                print(f"  Потеряно пищи в атаках: {sum(e.get('food_lost', 0) for e in attack_events)}")
\ No newline at end of file
+            if events.attacks:
+                print(f"  Атак на колонию: {events.attacks}")
+                print(f"  Успешно отражено: {events.successful_defenses}")
+                print(f"  Потеряно муравьев в атаках: {events.ants_lost}")
+                print(f"  Потеряно пищи в атаках: {events.food_lost}")
\ No newline at end of file
@@ -0,0 +1,126 @@
+import math
+from statistics import NormalDist, mean, variance
+from typing import Dict, Any, List, Optional, Iterable, Sequence
+
+from core.batch import run_ensemble
+from core.config import SimulationConfig
+
+METRICS = {
+    "survival": lambda r: 0.0 if r["collapsed"] else 1.0,
+    "days": lambda r: float(r["days"]),
+    "population": lambda r: float(r["population"]),
+    "workers": lambda r: float(r["workers"]),
+    "soldiers": lambda r: float(r["soldiers"]),
+    "food": lambda r: float(r["food"]),
+    "total_deaths": lambda r: float(r["total_deaths"]),
+}
+
+
+EXACT_T_DEGREES = 30
+
+
+def _t_central_probability(t: float, degrees_of_freedom: int) -> float:
+    # P(|T| < t) для целого числа степеней свободы, конечный ряд Абрамовица-Стиган 26.7.3-26.7.4
+    v = degrees_of_freedom
+    theta = math.atan(t / math.sqrt(v))
+    cos2 = math.cos(theta) ** 2
+    if v % 2:
+        total, term = 0.0, 1.0
+        for k in range(1, (v - 1) // 2 + 1):
+            total += term
+            term *= cos2 * (2 * k) / (2 * k + 1)
+        series = math.sin(theta) * math.cos(theta) * total if v > 1 else 0.0
+        return 2 / math.pi * (theta + series)
+    total, term = 0.0, 1.0
+    for k in range(1, v // 2 + 1):
+        total += term
+        term *= cos2 * (2 * k - 1) / (2 * k)
+    return math.sin(theta) * total
+
+
+def _t_quantile(probability: float, degrees_of_freedom: int) -> float:
+    if probability < 0.5:
+        return -_t_quantile(1 - probability, degrees_of_freedom)
+    v = degrees_of_freedom
+    if v <= EXACT_T_DEGREES:
+        # При малом числе степеней свободы приближение занижает квантиль, поэтому обращаем точную функцию
+        target = 2 * probability - 1
+        high = 1.0
+        while _t_central_probability(high, v) < target:
+            high *= 2
+        low = 0.0
+        for _ in range(100):
+            middle = (low + high) / 2
+            if _t_central_probability(middle, v) < target:
+                low = middle
+            else:
+                high = middle
+        return (low + high) / 2
+
+    # Разложение Корниша-Фишера для квантиля распределения Стьюдента
+    z = NormalDist().inv_cdf(probability)
+    return (z + (z ** 3 + z) / (4 * v) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * v ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * v ** 3))
+
+
+def paired_difference(values_a: List[float], values_b: List[float], confidence: float = 0.95) -> Dict[str, float]:
+    n = len(values_a)
+    if n < 2:
+        raise ValueError("at least two paired runs are required")
+    differences = [b - a for a, b in zip(values_a, values_b)]
+    diff_mean = mean(differences)
+    diff_variance = variance(differences)
+    half_width = _t_quantile(0.5 + confidence / 2, n - 1) * math.sqrt(diff_variance / n)
+
+    # Во сколько раз парная схема уменьшает дисперсию по сравнению с независимыми выборками
+    independent_variance = variance(values_a) + variance(values_b)
+    if diff_variance > 0:
+        reduction = independent_variance / diff_variance
+    else:
+        reduction = math.inf if independent_variance > 0 else 1.0
+
+    return {
+        "mean_a": mean(values_a),
+        "mean_b": mean(values_b),
+        "difference": diff_mean,
+        "ci_low": diff_mean - half_width,
+        "ci_high": diff_mean + half_width,
+        "significant": not (diff_mean - half_width <= 0 <= diff_mean + half_width),
+        "variance_reduction": reduction,
+    }
+
+
+def compare_configs(
+        config_a: SimulationConfig,
+        config_b: SimulationConfig,
+        days: int,
+        seeds: Iterable[int],
+        metrics: Sequence[str] = ("survival", "days", "population", "food"),
+        confidence: float = 0.95,
+        processes: Optional[int] = None
+) -> Dict[str, Any]:
+    unknown = [name for name in metrics if name not in METRICS]
+    if unknown:
+        raise ValueError(f"unknown metrics: {', '.join(unknown)}")
+    for config in (config_a, config_b):
+        if error := config.validate():
+            raise ValueError(f"invalid configuration: {error}")
+
+    # Одинаковые seed дают обеим конфигурациям общие случайные потоки (см. core.rng)
+    seeds = list(seeds)
+    results_a = run_ensemble(config_a, days, seeds, processes)
+    results_b = run_ensemble(config_b, days, seeds, processes)
+
+    return {
+        "runs": len(seeds),
+        "days": days,
+        "confidence": confidence,
+        "metrics": {
+            name: paired_difference(
+                [METRICS[name](r) for r in results_a],
+                [METRICS[name](r) for r in results_b],
+                confidence
+            )
+            for name in metrics
+        },
+    }
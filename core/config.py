@@ -27,12 +27,18 @@ class SimulationConfig:
     queen_max_age: int = 50
     worker_max_age: int = 30
     soldier_max_age: int = 25
+    drone_max_age: int = 20
 
     show_detailed_stats: bool = True
 
     attack_chance: float = 0.15
     min_days_for_attack: int = 5
 
+    hazard_scheduling: bool = False
+
+    super_individual_threshold: Optional[int] = None
+    super_individual_split_fraction: float = 0.5
+
     def validate(self) -> Optional[str]:
         probabilities = [
             (self.disease_chance, "disease_chance"),
@@ -41,7 +47,8 @@ class SimulationConfig:
             (self.queen_egg_laying_chance, "queen_egg_laying_chance"),
             (self.larva_starvation_chance, "larva_starvation_chance"),
             (self.worker_chance + self.soldier_chance, "sum of development chances"),
-            (self.attack_chance, "attack_chance")
+            (self.attack_chance, "attack_chance"),
+            (self.super_individual_split_fraction, "super_individual_split_fraction")
         ]
 
         for value, name in probabilities:
@@ -51,4 +58,7 @@ class SimulationConfig:
         if self.queen_egg_min_count > self.queen_egg_max_count:
             return "queen_egg_min_count cannot be greater than queen_egg_max_count"
 
+        if self.super_individual_threshold is not None and self.super_individual_threshold < 1:
+            return f"super_individual_threshold must be positive, got {self.super_individual_threshold}"
+
         return None
\ No newline at end of file
@@ -0,0 +1,191 @@
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Sequence
+
+from ants.group import head_count
+from core.batch import quiet_output
+from core.colony import AntColony
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+RATE_WINDOW = 3.0
+
+
+def sparkline(values: Sequence[float], width: int) -> str:
+    values = list(values)[-width:]
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    span = high - low
+    if span == 0:
+        return SPARK_CHARS[0] * len(values)
+    return "".join(SPARK_CHARS[int((v - low) / span * (len(SPARK_CHARS) - 1))] for v in values)
+
+
+class Dashboard:
+    def __init__(self, colony: AntColony, max_days: int, fps: float = 10.0, history: int = 240,
+                 log_size: int = 200, day_delay: float = 0.0):
+        self.colony = colony
+        self.max_days = max_days
+        self.frame_interval = 1.0 / fps
+        self.day_delay = day_delay
+
+        # Поток симуляции только дописывает в deque и подменяет ссылку на снимок; отрисовка лишь читает
+        self.snapshot: Dict[str, Any] = self._snapshot()
+        self.population = deque(maxlen=history)
+        self.food = deque(maxlen=history)
+        self.deaths = deque(maxlen=history)
+        self.log = deque(maxlen=log_size)
+        self.finished = threading.Event()
+        self.stopped = threading.Event()
+        self._thread = threading.Thread(target=self._simulate, name="antsim-simulation", daemon=True)
+        self._events_seen = len(colony.events_log)
+        self._deaths_seen = colony.death_stats.total_deaths
+        self._rate_samples = deque()
+
+    def run(self) -> AntColony:
+        with quiet_output():
+            self._thread.start()
+            try:
+                self._render()
+            finally:
+                self.stopped.set()
+                self._thread.join()
+        return self.colony
+
+    def _render(self) -> None:
+        # stdout здесь уже перенаправлен, поэтому терминал проверяется по исходным потокам
+        if not (sys.__stdin__ and sys.__stdin__.isatty() and sys.__stdout__ and sys.__stdout__.isatty()):
+            self._plain_loop()
+            return
+        try:
+            import curses
+        except ImportError:
+            self._plain_loop()
+            return
+        try:
+            curses.wrapper(self._curses_loop)
+        except curses.error:
+            self._plain_loop()
+
+    def _snapshot(self) -> Dict[str, Any]:
+        colony = self.colony
+        return {
+            "day": colony.day,
+            "queen_alive": colony.queen.is_alive(),
+            "queen_health": colony.queen.health,
+            "queen_age": colony.queen.age,
+            "workers": head_count(colony.workers),
+            "soldiers": head_count(colony.soldiers),
+            "larvae": len(colony.larvae),
+            "pupae": len(colony.pupae),
+            "food": colony.food_storage,
+            "deaths": colony.death_stats.total_deaths,
+            "alive": colony.is_alive(),
+            "time": time.monotonic(),
+        }
+
+    def _simulate(self) -> None:
+        try:
+            for _ in range(self.max_days):
+                if self.stopped.is_set():
+                    break
+                self.colony.simulate_day()
+                self._publish()
+                if not self.colony.is_alive():
+                    self.log.append(f"День {self.colony.day}: колония погибла")
+                    break
+                if self.day_delay:
+                    time.sleep(self.day_delay)
+        finally:
+            self.finished.set()
+
+    def _publish(self) -> None:
+        colony = self.colony
+        snapshot = self._snapshot()
+        self.population.append(colony.get_total_ants())
+        self.food.append(colony.food_storage)
+        self.deaths.append(snapshot["deaths"] - self._deaths_seen)
+        self._deaths_seen = snapshot["deaths"]
+
+        events = colony.events_log
+        for index in range(self._events_seen, len(events)):
+            self.log.append(f"День {events[index]['day']}: {events[index]['description']}")
+        self._events_seen = len(events)
+        if self.deaths[-1]:
+            self.log.append(f"День {colony.day}: умерло муравьев — {self.deaths[-1]}")
+        self.snapshot = snapshot
+
+    def _rate(self, snapshot: Dict[str, Any]) -> float:
+        samples = self._rate_samples
+        if not samples or samples[-1][0] != snapshot["time"]:
+            samples.append((snapshot["time"], snapshot["day"]))
+        now = time.monotonic()
+        # Опорой служит самый свежий снимок старше окна: при медленной симуляции кадры
+        # между снимками не дают нулей, а при остановке скорость плавно падает
+        while len(samples) > 2 and now - samples[1][0] >= RATE_WINDOW:
+            samples.popleft()
+        first_time, first_day = samples[0]
+        elapsed = now - first_time
+        return (snapshot["day"] - first_day) / elapsed if elapsed > 0 else 0.0
+
+    def _frame(self, width: int, height: int) -> List[str]:
+        snapshot = self.snapshot
+        rate = self._rate(snapshot)
+
+        state = "идет" if not self.finished.is_set() else ("завершена" if snapshot["alive"] else "колония погибла")
+        queen = (f"здоровье {snapshot['queen_health']}, возраст {snapshot['queen_age']}"
+                 if snapshot["queen_alive"] else "погибла")
+        spark_width = max(10, width - 16)
+        lines = [
+            f"Колония '{self.colony.name}' — день {snapshot['day']}/{self.max_days} ({state}, {rate:.1f} дн/с)",
+            f"Королева: {queen}",
+            f"Рабочие: {snapshot['workers']}  Солдаты: {snapshot['soldiers']}  "
+            f"Личинки: {snapshot['larvae']}  Куколки: {snapshot['pupae']}",
+            f"Пища: {snapshot['food']}  Всего смертей: {snapshot['deaths']}",
+            "",
+            f"Население  {sparkline(list(self.population), spark_width)}",
+            f"Пища       {sparkline(list(self.food), spark_width)}",
+            f"Смерти     {sparkline(list(self.deaths), spark_width)}",
+            "",
+            "События:",
+        ]
+        log_lines = list(self.log)[-max(0, height - len(lines) - 2):]
+        lines.extend(f"  {line}" for line in log_lines)
+        lines.append("")
+        lines.append("q — выход")
+        return [line[:width - 1] for line in lines[:height]]
+
+    def _curses_loop(self, screen) -> None:
+        import curses
+        curses.curs_set(0)
+        screen.nodelay(True)
+        while True:
+            started = time.monotonic()
+            height, width = screen.getmaxyx()
+            screen.erase()
+            for row, line in enumerate(self._frame(width, height)):
+                try:
+                    screen.addstr(row, 0, line)
+                except curses.error:
+                    pass
+            screen.refresh()
+
+            key = screen.getch()
+            if key in (ord("q"), ord("Q"), ord("й"), ord("Й")):
+                return
+            if self.finished.is_set() and key != -1:
+                return
+            time.sleep(max(0.0, self.frame_interval - (time.monotonic() - started)))
+
+    def _plain_loop(self) -> None:
+        out = sys.__stdout__
+        while True:
+            snapshot = self.snapshot
+            out.write(f"\rДень {snapshot['day']}/{self.max_days}  население {snapshot['workers'] + snapshot['soldiers'] + snapshot['queen_alive']}  "
+                      f"пища {snapshot['food']}  смерти {snapshot['deaths']}   ")
+            out.flush()
+            if self.finished.wait(self.frame_interval):
+                out.write("\n")
+                return
@@ -0,0 +1,157 @@
+import math
+import time
+from typing import Callable, Dict, Any, List, Optional, Sequence
+
+from core.batch import quiet_output, seed_simulation
+from core.colony import AntColony
+from core.config import SimulationConfig
+
+Engine = Callable[[SimulationConfig, int, int], Dict[str, Any]]
+
+
+def _trace(colony, days: int) -> Dict[str, Any]:
+    population, food = [], []
+    for _ in range(days):
+        colony.simulate_day()
+        stats = colony.get_statistics()
+        population.append(stats["population"]["total_live"])
+        food.append(stats["resources"]["food"])
+        if not colony.is_alive():
+            break
+
+    # После гибели колонии ряды продолжаются последним значением, чтобы дни были сравнимы
+    survived = colony.day
+    while len(population) < days:
+        population.append(population[-1] if population else 0)
+        food.append(food[-1] if food else 0)
+    return {
+        "survival_days": survived,
+        "population": population,
+        "food": food,
+        "deaths_by_cause": colony.get_statistics()["death_statistics"]["by_cause"],
+    }
+
+
+def reference_engine(config: SimulationConfig, days: int, seed: int) -> Dict[str, Any]:
+    seed_simulation(seed)
+    with quiet_output():
+        return _trace(AntColony(f"reference-{seed}", config), days)
+
+
+def sharded_engine(shards: int = 2, capacity: int = 20_000) -> Engine:
+    from core.sharded import ShardedColony
+
+    def engine(config: SimulationConfig, days: int, seed: int) -> Dict[str, Any]:
+        seed_simulation(seed)
+        with ShardedColony(f"sharded-{seed}", config, shards, capacity, seed) as colony:
+            return _trace(colony, days)
+
+    return engine
+
+
+def ks_two_sample(a: Sequence[float], b: Sequence[float]) -> Dict[str, float]:
+    a, b = sorted(a), sorted(b)
+    n, m = len(a), len(b)
+    i = j = 0
+    statistic = 0.0
+    while i < n and j < m:
+        value = min(a[i], b[j])
+        while i < n and a[i] == value:
+            i += 1
+        while j < m and b[j] == value:
+            j += 1
+        statistic = max(statistic, abs(i / n - j / m))
+
+    effective = math.sqrt(n * m / (n + m))
+    lam = (effective + 0.12 + 0.11 / effective) * statistic
+    if lam < 0.3:
+        p_value = 1.0
+    else:
+        p_value = 2 * sum((-1) ** (k - 1) * math.exp(-2 * k * k * lam * lam) for k in range(1, 101))
+    return {"statistic": statistic, "p_value": min(1.0, max(0.0, p_value))}
+
+
+def _run_engine(engine: Engine, config: SimulationConfig, days: int, seeds: Sequence[int]):
+    started = time.perf_counter()
+    traces = [engine(config, days, seed) for seed in seeds]
+    return traces, time.perf_counter() - started
+
+
+def _deaths_per_run(traces: List[Dict[str, Any]], cause: str) -> List[int]:
+    return [trace["deaths_by_cause"].get(cause, 0) for trace in traces]
+
+
+def compare_engines(
+        candidate: Engine,
+        configs: Sequence[SimulationConfig],
+        days: int,
+        seeds: Sequence[int],
+        reference: Engine = reference_engine,
+        alpha: float = 0.01,
+        checkpoints: Optional[Sequence[int]] = None
+) -> Dict[str, Any]:
+    checkpoints = list(checkpoints) if checkpoints else sorted({max(1, days // 4), max(1, days // 2), days})
+    results = []
+    reference_time = candidate_time = 0.0
+
+    for config in configs:
+        reference_traces, elapsed = _run_engine(reference, config, days, seeds)
+        reference_time += elapsed
+        candidate_traces, elapsed = _run_engine(candidate, config, days, seeds)
+        candidate_time += elapsed
+
+        tests = {"survival_days": ks_two_sample(
+            [t["survival_days"] for t in reference_traces],
+            [t["survival_days"] for t in candidate_traces]
+        )}
+        for series in ("population", "food"):
+            for day in checkpoints:
+                tests[f"{series}@{day}"] = ks_two_sample(
+                    [t[series][day - 1] for t in reference_traces],
+                    [t[series][day - 1] for t in candidate_traces]
+                )
+        # Смерти внутри прогона зависимы (одна атака убивает многих), поэтому сравниваются
+        # распределения числа смертей по прогонам для каждой причины, а не сумма по всем прогонам
+        causes = sorted({cause for trace in reference_traces + candidate_traces for cause in trace["deaths_by_cause"]})
+        for cause in causes:
+            tests[f"deaths:{cause}"] = ks_two_sample(
+                _deaths_per_run(reference_traces, cause),
+                _deaths_per_run(candidate_traces, cause)
+            )
+        results.append({"config": config, "tests": tests})
+
+    # Поправка Бонферрони на число проверок во всех конфигурациях
+    test_count = sum(len(r["tests"]) for r in results)
+    threshold = alpha / max(1, test_count)
+    for result in results:
+        for test in result["tests"].values():
+            test["passed"] = test["p_value"] >= threshold
+        result["passed"] = all(test["passed"] for test in result["tests"].values())
+
+    return {
+        "passed": all(r["passed"] for r in results),
+        "alpha": alpha,
+        "threshold": threshold,
+        "runs_per_config": len(seeds),
+        "days": days,
+        "configs": results,
+        "reference_seconds": reference_time,
+        "candidate_seconds": candidate_time,
+        "speedup": reference_time / candidate_time if candidate_time > 0 else math.inf,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"Проверка эквивалентности: {'ПРОЙДЕНА' if report['passed'] else 'НЕ ПРОЙДЕНА'}",
+        f"Прогонов на конфигурацию: {report['runs_per_config']}, дней: {report['days']}, "
+        f"порог p-value: {report['threshold']:.2e}",
+        f"Ускорение: {report['speedup']:.2f}x "
+        f"(эталон {report['reference_seconds']:.1f} с, кандидат {report['candidate_seconds']:.1f} с)",
+    ]
+    for index, result in enumerate(report["configs"], 1):
+        lines.append(f"\nКонфигурация {index}: {'ok' if result['passed'] else 'РАСХОЖДЕНИЕ'}")
+        for name, test in result["tests"].items():
+            mark = "ok" if test["passed"] else "!!"
+            lines.append(f"  [{mark}] {name}: статистика={test['statistic']:.3f}, p={test['p_value']:.4f}")
+    return "\n".join(lines)
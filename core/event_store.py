@@ -0,0 +1,97 @@
+import json
+from collections import deque
+from typing import Dict, Any, Iterator, List, Optional
+
+
+class EventStore:
+    def __init__(self, recent_size: int = 50, spill_path: Optional[str] = None, keep_in_memory: int = 1000):
+        if spill_path is not None and keep_in_memory < 1:
+            raise ValueError("keep_in_memory must be positive when spilling to disk")
+        self.spill_path = spill_path
+        self.spilling = spill_path is not None
+        self.keep_in_memory = keep_in_memory
+
+        # События нумеруются по порядку; индексы хранят номера, а не сами события
+        self._memory: List[Dict[str, Any]] = []
+        self._memory_start = 0
+        self._spilled_offsets: List[int] = []
+        self.by_type: Dict[str, List[int]] = {}
+        self.by_day: Dict[int, List[int]] = {}
+        self.recent_events = deque(maxlen=recent_size)
+
+        self.attacks = 0
+        self.successful_defenses = 0
+        self.ants_lost = 0
+        self.food_lost = 0
+
+        if spill_path is not None:
+            open(spill_path, "w", encoding="utf-8").close()
+
+    def append(self, event: Dict[str, Any]) -> None:
+        index = len(self)
+        self._memory.append(event)
+        self.by_type.setdefault(event["type"], []).append(index)
+        self.by_day.setdefault(event["day"], []).append(index)
+        self.recent_events.append(event)
+
+        if event["type"] == "attack":
+            self.attacks += 1
+            self.ants_lost += event.get("ants_lost", 0)
+            self.food_lost += event.get("food_lost", 0)
+        if event.get("success", False):
+            self.successful_defenses += 1
+
+        if self.spilling and len(self._memory) >= 2 * self.keep_in_memory:
+            self._spill(len(self._memory) - self.keep_in_memory)
+
+    def count(self, event_type: str) -> int:
+        return len(self.by_type.get(event_type, ()))
+
+    def count_on_day(self, day: int) -> int:
+        return len(self.by_day.get(day, ()))
+
+    def of_type(self, event_type: str) -> List[Dict[str, Any]]:
+        return [self[index] for index in self.by_type.get(event_type, ())]
+
+    def on_day(self, day: int) -> List[Dict[str, Any]]:
+        return [self[index] for index in self.by_day.get(day, ())]
+
+    def recent(self, count: int) -> List[Dict[str, Any]]:
+        events = list(self.recent_events)
+        return events[-count:] if count > 0 else []
+
+    def __len__(self) -> int:
+        return self._memory_start + len(self._memory)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(self._memory_start):
+            yield self._read_spilled(index)
+        yield from self._memory
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("event index out of range")
+        if index < self._memory_start:
+            return self._read_spilled(index)
+        return self._memory[index - self._memory_start]
+
+    def _spill(self, count: int) -> None:
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            for event in self._memory[:count]:
+                self._spilled_offsets.append(f.tell())
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        # Список пересоздается, а не сдвигается: ответвленные копии могут ссылаться на старый
+        self._memory = self._memory[count:]
+        self._memory_start += count
+
+    def _read_spilled(self, index: int) -> Dict[str, Any]:
+        with open(self.spill_path, encoding="utf-8") as f:
+            f.seek(self._spilled_offsets[index])
+            return json.loads(f.readline())
@@ -1,8 +1,9 @@
 from enum import Enum, auto
 from typing import Dict
-import random
 from abc import ABC, abstractmethod
 
+from core.rng import streams
+
 
 class EventType(Enum):
     ATTACK = auto()
@@ -18,7 +19,7 @@ class ColonyEvent(ABC):
     def __init__(self, event_type: EventType, config):
         self.event_type = event_type
         self.config = config
-        self.severity = random.uniform(0.1, 1.0)
+        self.severity = streams.attack.uniform(0.1, 1.0)
 
     @abstractmethod
     def execute(self, colony) -> Dict:
@@ -0,0 +1,204 @@
+import copy
+import os
+import pickle
+import select
+import sys
+from typing import Dict, Any, Iterator, List, Optional, Sequence
+
+from ants.queen import QueenAnt
+from ants.soldier import SoldierAnt
+from ants.worker import WorkerAnt
+from core.batch import apply_overrides, colony_outcome, quiet_output
+from core.colony import AntColony, DeathStatistics
+from core.event_store import EventStore
+from core.hazards import HazardScheduler
+from core.rng import RandomStreams, streams
+
+
+class SharedHistory:
+    def __init__(self, base: Optional[Sequence] = None, base_length: int = 0):
+        # Префикс base общий с родительской веткой; он только дополняется, поэтому его не копируем
+        self._base = base if base is not None else []
+        self._base_length = base_length
+        self._own: List = []
+
+    def append(self, item) -> None:
+        self._own.append(item)
+
+    def extend(self, items) -> None:
+        self._own.extend(items)
+
+    def __len__(self) -> int:
+        return self._base_length + len(self._own)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __iter__(self) -> Iterator:
+        for i in range(self._base_length):
+            yield self._base[i]
+        yield from self._own
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        if index < self._base_length:
+            return self._base[index]
+        return self._own[index - self._base_length]
+
+
+def _share(history: Sequence) -> SharedHistory:
+    return SharedHistory(history, len(history))
+
+
+def _fork_events(parent: EventStore) -> EventStore:
+    events = EventStore.__new__(EventStore)
+    events.__dict__.update(parent.__dict__)
+    # Ветка читает уже вытесненный родителем префикс, но сама на диск не пишет
+    events.spilling = False
+    events._memory = _share(parent._memory)
+    events._spilled_offsets = _share(parent._spilled_offsets)
+    events.by_type = {event_type: _share(indexes) for event_type, indexes in parent.by_type.items()}
+    events.by_day = {day: _share(indexes) for day, indexes in parent.by_day.items()}
+    events.recent_events = parent.recent_events.copy()
+    return events
+
+
+def fork_colony(colony: AntColony, overrides: Optional[Dict[str, Any]] = None,
+                name: Optional[str] = None) -> AntColony:
+    config = apply_overrides(colony.config, overrides or {})
+
+    child = copy.copy(colony)
+    child.name = name or colony.name
+    child.config = config
+    child.journal = None
+    child.life_table = None
+    child.metrics = None
+
+    # Живые муравьи меняются каждый день, поэтому копируются сразу; их атрибуты — скаляры
+    child.queen = copy.copy(colony.queen)
+    child.workers = [copy.copy(ant) for ant in colony.workers]
+    child.soldiers = [copy.copy(ant) for ant in colony.soldiers]
+    child.larvae = [copy.copy(ant) for ant in colony.larvae]
+    child.pupae = [copy.copy(ant) for ant in colony.pupae]
+    for ant in [child.queen] + child.workers + child.soldiers + child.larvae + child.pupae:
+        ant.config = config
+        # max_age копируется из конфигурации при создании, поэтому переопределения возраста применяются заново
+        if isinstance(ant, QueenAnt):
+            ant.max_age = config.queen_max_age
+        elif isinstance(ant, WorkerAnt):
+            ant.max_age = config.worker_max_age
+        elif isinstance(ant, SoldierAnt):
+            ant.max_age = config.soldier_max_age
+        ant.__dict__.pop("hazard_days", None)
+        ant.__dict__.pop("due_hazards", None)
+    # Заранее разыгранные дни событий принадлежат родителю; ветка разыграет свои заново
+    child.hazards = HazardScheduler(config) if config.hazard_scheduling else None
+
+    parent_stats = colony.death_stats
+    stats = DeathStatistics.__new__(DeathStatistics)
+    stats.__dict__.update(parent_stats.__dict__)
+    stats.deaths_by_cause = parent_stats.deaths_by_cause.copy()
+    stats.deaths_by_type = parent_stats.deaths_by_type.copy()
+    stats.deaths_by_age_group = parent_stats.deaths_by_age_group.copy()
+    stats.daily_deaths = _share(parent_stats.daily_deaths)
+    stats.dead_ants = _share(parent_stats.dead_ants)
+    child.death_stats = stats
+
+    child.events_log = _fork_events(colony.events_log)
+    return child
+
+
+class ColonyBranch:
+    def __init__(self, colony: AntColony, seed: Optional[int] = None):
+        self.colony = colony
+        self.seed = seed
+        self._rng_state = RandomStreams(seed).getstate()
+
+    def advance(self, days: int, quiet: bool = True) -> bool:
+        with streams.activated(self._rng_state):
+            if quiet:
+                with quiet_output():
+                    self._simulate(days)
+            else:
+                self._simulate(days)
+        return self.colony.is_alive()
+
+    def outcome(self) -> Dict[str, Any]:
+        return colony_outcome(self.colony, self.seed)
+
+    def _simulate(self, days: int) -> None:
+        for _ in range(days):
+            self.colony.simulate_day()
+            if not self.colony.is_alive():
+                break
+
+
+def branch(colony: AntColony, overrides: Optional[Dict[str, Any]] = None, seed: Optional[int] = None,
+           name: Optional[str] = None) -> ColonyBranch:
+    return ColonyBranch(fork_colony(colony, overrides, name), seed)
+
+
+def run_branches(
+        colony: AntColony,
+        branches: Sequence[Dict[str, Any]],
+        days: int,
+        processes: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    if not hasattr(os, "fork") or processes == 1:
+        results = []
+        for spec in branches:
+            child = branch(colony, spec.get("overrides"), spec.get("seed"))
+            child.advance(days)
+            results.append(child.outcome())
+        return results
+
+    # Дочерние процессы получают колонию через copy-on-write страницы, без сериализации
+    limit = processes or os.cpu_count() or 1
+    results: List[Optional[Dict[str, Any]]] = [None] * len(branches)
+    running = {}
+    buffers = {}
+    queue = list(enumerate(branches))
+    while queue or running:
+        while queue and len(running) < limit:
+            index, spec = queue.pop(0)
+            read_fd, write_fd = os.pipe()
+            sys.stdout.flush()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                status = 0
+                try:
+                    child = branch(colony, spec.get("overrides"), spec.get("seed"))
+                    child.advance(days)
+                    payload = pickle.dumps(child.outcome())
+                except BaseException as e:
+                    payload = pickle.dumps(e)
+                    status = 1
+                with os.fdopen(write_fd, "wb") as pipe:
+                    pipe.write(payload)
+                os._exit(status)
+            os.close(write_fd)
+            running[read_fd] = (index, pid)
+            buffers[read_fd] = []
+
+        # Канал читается до EOF раньше ожидания процесса: иначе большой результат заблокирует запись;
+        # ждем только свои pid, чтобы не забрать чужие дочерние процессы (пул, шарды)
+        ready, _, _ = select.select(list(running), [], [])
+        for read_fd in ready:
+            chunk = os.read(read_fd, 65536)
+            if chunk:
+                buffers[read_fd].append(chunk)
+                continue
+            os.close(read_fd)
+            index, pid = running.pop(read_fd)
+            os.waitpid(pid, 0)
+            payload = pickle.loads(b"".join(buffers.pop(read_fd)))
+            if isinstance(payload, BaseException):
+                raise payload
+            results[index] = payload
+    return results
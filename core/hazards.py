@@ -0,0 +1,97 @@
+import heapq
+import itertools
+import math
+import random
+from typing import List, Optional
+
+from core.rng import streams
+
+
+def geometric(rng: random.Random, p: float) -> Optional[int]:
+    # Номер первого успешного испытания Бернулли; None, если успех невозможен
+    if p <= 0:
+        return None
+    if p >= 1:
+        return 1
+    return math.floor(math.log(1 - rng.random()) / math.log(1 - p)) + 1
+
+
+class HazardScheduler:
+    def __init__(self, config):
+        self.config = config
+        self.day = 0
+        self._heap: List[tuple] = []
+        self._order = itertools.count()
+        self._due: List = []
+        self._forgotten = 0
+
+    def begin_day(self, day: int) -> None:
+        self.day = day
+        heap = self._heap
+        while heap and heap[0][0] <= day:
+            due, _, kind, ant = heapq.heappop(heap)
+            if self._current(due, kind, ant):
+                self._mark_due(ant, kind)
+
+    def register(self, ant) -> None:
+        # Первый розыгрыш приходится на текущий день; событие на сегодня сразу помечается наступившим
+        ant.due_hazards = set()
+        ant.hazard_days = {}
+        self._schedule(ant, "disease", self.day)
+        self._schedule(ant, "injury", self.day)
+        self._schedule_old_age(ant, self.day)
+
+    def forget(self, ant) -> None:
+        # Муравей поглощен группой: его записи в куче устаревают, новых розыгрышей не будет
+        if ant.hazard_days:
+            self._forgotten += len(ant.hazard_days)
+        ant.hazard_days = None
+        ant.due_hazards = None
+
+    def end_day(self) -> None:
+        for ant in self._due:
+            if ant.is_alive():
+                for kind in ant.due_hazards:
+                    if kind == "old_age":
+                        self._schedule_old_age(ant, self.day + 1)
+                    else:
+                        self._schedule(ant, kind, self.day + 1)
+            ant.due_hazards.clear()
+        self._due = []
+
+        # После слияния в группы куча может состоять в основном из устаревших записей
+        if self._forgotten * 2 > len(self._heap):
+            self._heap = [entry for entry in self._heap if self._current(entry[0], entry[2], entry[3])]
+            heapq.heapify(self._heap)
+            self._forgotten = 0
+
+    @staticmethod
+    def _current(due: int, kind: str, ant) -> bool:
+        # Записи умерших и перерегистрированных муравьев удаляются лениво
+        return ant.is_alive() and ant.hazard_days is not None and ant.hazard_days.get(kind) == due
+
+    def _mark_due(self, ant, kind: str) -> None:
+        if not ant.due_hazards:
+            self._due.append(ant)
+        ant.due_hazards.add(kind)
+
+    def _schedule_old_age(self, ant, day: int) -> None:
+        # Проверка старости начинается в день, когда после шага возраст достигнет max_age
+        self._schedule(ant, "old_age", max(day, day + ant.max_age - ant.age - 1))
+
+    def _schedule(self, ant, kind: str, first_day: int) -> None:
+        if kind == "disease":
+            wait = geometric(streams.disease, self.config.disease_chance)
+        elif kind == "injury":
+            wait = geometric(streams.injury, self.config.injury_chance)
+        else:
+            wait = geometric(streams.old_age, self.config.old_age_death_chance)
+        if wait is None:
+            ant.hazard_days.pop(kind, None)
+            return
+        due = first_day + wait - 1
+        ant.hazard_days[kind] = due
+        if due <= self.day:
+            self._mark_due(ant, kind)
+        else:
+            heapq.heappush(self._heap, (due, next(self._order), kind, ant))
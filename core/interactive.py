@@ -0,0 +1,124 @@
+import io
+import queue
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from core.colony import AntColony
+from core.fork import fork_colony
+
+
+@dataclass
+class DayReport:
+    day: int
+    output: str
+    alive: bool
+    colony: AntColony
+
+
+class _RoutedStdout:
+    def __init__(self, target, thread: threading.Thread):
+        self._target = target
+        self._thread = thread
+        self.buffer = io.StringIO()
+
+    def write(self, text: str) -> int:
+        if threading.current_thread() is self._thread:
+            return self.buffer.write(text)
+        return self._target.write(text)
+
+    def flush(self) -> None:
+        if threading.current_thread() is not self._thread:
+            self._target.flush()
+
+    def take(self) -> str:
+        text = self.buffer.getvalue()
+        self.buffer = io.StringIO()
+        return text
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+
+class PipelinedRunner:
+    def __init__(self, colony: AntColony, max_days: int, buffer_size: int = 3):
+        if buffer_size < 1:
+            raise ValueError("buffer_size must be positive")
+        self.colony = colony
+        self.max_days = max_days
+        self.last_shown: Optional[DayReport] = None
+
+        self._reports: queue.Queue = queue.Queue(maxsize=buffer_size)
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._simulate, name="antsim-pipeline", daemon=True)
+        self._stdout: Optional[_RoutedStdout] = None
+        self._saved_stdout = None
+
+    def start(self) -> 'PipelinedRunner':
+        # Вывод фонового потока копится в отчет дня, остальные потоки печатают как обычно
+        self._saved_stdout = sys.stdout
+        self._stdout = _RoutedStdout(sys.stdout, self._thread)
+        sys.stdout = self._stdout
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        while self._thread.is_alive():
+            try:
+                self._reports.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        self._thread.join()
+        if self._saved_stdout is not None:
+            sys.stdout = self._saved_stdout
+            self._saved_stdout = None
+
+    def __enter__(self) -> 'PipelinedRunner':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.cancel()
+
+    def __iter__(self) -> Iterator[DayReport]:
+        while True:
+            item = self._reports.get()
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            self.last_shown = item
+            yield item
+
+    def shown_colony(self) -> AntColony:
+        # Фоновый поток мог уйти вперед: итоговая статистика берется со снимка последнего показанного дня
+        return self.last_shown.colony if self.last_shown else self.colony
+
+    def _simulate(self) -> None:
+        try:
+            for _ in range(self.max_days):
+                if self._cancelled.is_set():
+                    return
+                self.colony.simulate_day()
+                report = DayReport(
+                    day=self.colony.day,
+                    output=self._stdout.take(),
+                    alive=self.colony.is_alive(),
+                    colony=fork_colony(self.colony)
+                )
+                if not self._put(report) or not report.alive:
+                    break
+        except BaseException as e:
+            self._put(e)
+        finally:
+            self._put(None)
+
+    def _put(self, item) -> bool:
+        while not self._cancelled.is_set():
+            try:
+                self._reports.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                continue
+        return False
@@ -0,0 +1,371 @@
+import mmap
+import struct
+from bisect import bisect_left, bisect_right
+from typing import Dict, Any, List, Optional, Tuple
+
+from ants.group import head_count
+from ants.larva import Larva
+from ants.queen import QueenAnt
+from ants.soldier import SoldierAnt
+from ants.worker import WorkerAnt
+from core.attack_event import AttackEvent
+
+MAGIC = b"ANTJ\x02"
+
+REC_CAUSE = 0
+REC_DAY = 1
+REC_EGGS = 2
+REC_LARVA = 3
+REC_PUPATE = 4
+REC_HATCH = 5
+REC_DEATH = 6
+REC_ATTACK = 7
+REC_KEYFRAME = 8
+
+_CAUSE = struct.Struct("<BBB")          # тип, код причины, длина имени
+_DAY = struct.Struct("<Biih")           # тип, день, пища, здоровье королевы
+_EGGS = struct.Struct("<BiH")           # тип, день, число яиц
+_CASTE = struct.Struct("<BiB")          # тип, день, будущая каста
+_DEATH = struct.Struct("<BiBBBH")       # тип, день, вид, каста, причина, возраст
+_ATTACK = struct.Struct("<BiffBBiI")    # тип, день, severity, strength, атакующий, успех, пища, потери
+_KEYFRAME = struct.Struct("<Bi" + "i" * 18 + "B")
+
+KIND_QUEEN = 0
+KIND_WORKER = 1
+KIND_SOLDIER = 2
+KIND_LARVA = 3
+KIND_PUPA = 4
+
+CASTES = ["worker", "soldier", "drone"]
+_CASTE_CODES = {name: code for code, name in enumerate(CASTES)}
+_NO_CASTE = 255
+
+ATTACKERS = AttackEvent.ATTACKER_TYPES
+
+
+def death_kind(ant) -> int:
+    if isinstance(ant, QueenAnt):
+        return KIND_QUEEN
+    if isinstance(ant, WorkerAnt):
+        return KIND_WORKER
+    if isinstance(ant, SoldierAnt):
+        return KIND_SOLDIER
+    if isinstance(ant, Larva) and ant.growth_stage == "pupa":
+        return KIND_PUPA
+    return KIND_LARVA
+
+
+def _empty_state() -> Dict[str, Any]:
+    return {
+        "day": 0,
+        "food": 0,
+        "queen": {"is_alive": True, "age": 0, "health": 100, "eggs_laid": 0},
+        "workers": 0,
+        "soldiers": 0,
+        "larvae": {caste: 0 for caste in CASTES},
+        "pupae": {caste: 0 for caste in CASTES},
+        "total_deaths": 0,
+        "deaths_by_cause": {},
+        "attacks": 0,
+        "successful_defenses": 0,
+        "food_lost": 0,
+        "ants_lost": 0,
+    }
+
+
+class EventJournal:
+    def __init__(self, path: str, keyframe_interval: int = 10):
+        if keyframe_interval < 1:
+            raise ValueError("keyframe_interval must be positive")
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._cause_codes: Dict[str, int] = {}
+        self._state = _empty_state()
+
+    def start(self, colony) -> None:
+        self._state["food"] = colony.food_storage
+        self._state["workers"] = head_count(colony.workers)
+        self._state["soldiers"] = head_count(colony.soldiers)
+        self._write_keyframe()
+
+    def record_eggs(self, day: int, count: int) -> None:
+        self._file.write(_EGGS.pack(REC_EGGS, day, count))
+        self._state["queen"]["eggs_laid"] += count
+
+    def record_larva(self, day: int, future_type: str) -> None:
+        self._file.write(_CASTE.pack(REC_LARVA, day, _CASTE_CODES[future_type]))
+        self._state["larvae"][future_type] += 1
+
+    def record_pupation(self, day: int, future_type: str) -> None:
+        self._file.write(_CASTE.pack(REC_PUPATE, day, _CASTE_CODES[future_type]))
+        self._state["larvae"][future_type] -= 1
+        self._state["pupae"][future_type] += 1
+
+    def record_hatch(self, day: int, future_type: str) -> None:
+        self._file.write(_CASTE.pack(REC_HATCH, day, _CASTE_CODES[future_type]))
+        _apply_hatch(self._state, future_type)
+
+    def record_death(self, day: int, kind: int, future_type: Optional[str], cause: str, age: int) -> None:
+        caste = _CASTE_CODES.get(future_type, _NO_CASTE)
+        code = self._cause_code(cause)
+        self._file.write(_DEATH.pack(REC_DEATH, day, kind, caste, code, min(age, 0xFFFF)))
+        _apply_death(self._state, kind, future_type, cause, age)
+
+    def record_attack(self, day: int, attack: AttackEvent, result: Dict) -> None:
+        ants_lost = head_count(result["ants_lost"])
+        self._file.write(_ATTACK.pack(
+            REC_ATTACK, day, attack.severity, attack.strength,
+            ATTACKERS.index(attack.attacker), result["success"],
+            result["food_lost"], ants_lost
+        ))
+        _apply_attack(self._state, bool(result["success"]), result["food_lost"], ants_lost)
+
+    def end_day(self, colony) -> None:
+        self._file.write(_DAY.pack(REC_DAY, colony.day, colony.food_storage, colony.queen.health))
+        _apply_day(self._state, colony.day, colony.food_storage, colony.queen.health)
+        if colony.day % self.keyframe_interval == 0:
+            self._write_keyframe()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self) -> 'EventJournal':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _cause_code(self, cause: str) -> int:
+        code = self._cause_codes.get(cause)
+        if code is None:
+            code = len(self._cause_codes)
+            if code > 0xFF:
+                raise ValueError("too many distinct death causes for the journal")
+            name = cause.encode("utf-8")
+            self._file.write(_CAUSE.pack(REC_CAUSE, code, len(name)) + name)
+            self._cause_codes[cause] = code
+        return code
+
+    def _write_keyframe(self) -> None:
+        state = self._state
+        queen = state["queen"]
+        by_cause = [(self._cause_code(cause), count) for cause, count in state["deaths_by_cause"].items()]
+        self._file.write(_KEYFRAME.pack(
+            REC_KEYFRAME, state["day"], state["food"],
+            queen["age"], queen["health"], queen["eggs_laid"],
+            state["workers"], state["soldiers"],
+            *(state["larvae"][caste] for caste in CASTES),
+            *(state["pupae"][caste] for caste in CASTES),
+            state["total_deaths"], state["attacks"], state["successful_defenses"],
+            state["food_lost"], state["ants_lost"], len(by_cause),
+            queen["is_alive"]
+        ))
+        for code, count in by_cause:
+            self._file.write(struct.pack("<BI", code, count))
+        self._file.flush()
+
+
+class JournalReplayer:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an ant colony journal")
+
+        self._causes: Dict[int, str] = {}
+        self._keyframe_days: List[int] = []
+        self._keyframe_offsets: List[int] = []
+        self.last_day = 0
+        self._index()
+
+    def close(self) -> None:
+        self._data.close()
+
+    def __enter__(self) -> 'JournalReplayer':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def state_at(self, day: int) -> Dict[str, Any]:
+        if day < 0:
+            raise ValueError("day must be non-negative")
+        position = bisect_right(self._keyframe_days, day) - 1
+        state, offset = self._read_keyframe(self._keyframe_offsets[position])
+
+        for record_type, record, offset in self._records(offset):
+            if record[1] > day:
+                break
+            self._apply(state, record_type, record)
+        return state
+
+    def events(self, start_day: int = 0, end_day: Optional[int] = None) -> List[Dict[str, Any]]:
+        position = max(0, bisect_left(self._keyframe_days, start_day) - 1)
+        _, offset = self._read_keyframe(self._keyframe_offsets[position])
+        names = {
+            REC_EGGS: "eggs", REC_LARVA: "larva", REC_PUPATE: "pupation",
+            REC_HATCH: "hatch", REC_DEATH: "death", REC_ATTACK: "attack",
+        }
+
+        result = []
+        for record_type, record, offset in self._records(offset):
+            day = record[1]
+            if end_day is not None and day > end_day:
+                break
+            if day < start_day or record_type not in names:
+                continue
+            event = {"day": day, "type": names[record_type]}
+            event.update(self._describe(record_type, record))
+            result.append(event)
+        return result
+
+    def _index(self) -> None:
+        offset = len(MAGIC)
+        size = len(self._data)
+        while offset < size:
+            record_type = self._data[offset]
+            if record_type == REC_KEYFRAME:
+                day = struct.unpack_from("<i", self._data, offset + 1)[0]
+                self._keyframe_days.append(day)
+                self._keyframe_offsets.append(offset)
+                self.last_day = max(self.last_day, day)
+                _, offset = self._read_keyframe(offset)
+                continue
+            record, offset = self._read_record(record_type, offset)
+            if record_type == REC_CAUSE:
+                continue
+            self.last_day = max(self.last_day, record[1])
+
+        if not self._keyframe_offsets:
+            raise ValueError(f"{self.path} has no keyframes")
+
+    def _records(self, offset: int):
+        size = len(self._data)
+        while offset < size:
+            record_type = self._data[offset]
+            if record_type == REC_KEYFRAME:
+                _, offset = self._read_keyframe(offset)
+                continue
+            record, offset = self._read_record(record_type, offset)
+            if record_type != REC_CAUSE:
+                yield record_type, record, offset
+
+    def _read_record(self, record_type: int, offset: int) -> Tuple[tuple, int]:
+        if record_type == REC_CAUSE:
+            _, code, length = _CAUSE.unpack_from(self._data, offset)
+            start = offset + _CAUSE.size
+            self._causes[code] = self._data[start:start + length].decode("utf-8")
+            return (REC_CAUSE, code), start + length
+
+        layout = {
+            REC_DAY: _DAY, REC_EGGS: _EGGS, REC_LARVA: _CASTE, REC_PUPATE: _CASTE,
+            REC_HATCH: _CASTE, REC_DEATH: _DEATH, REC_ATTACK: _ATTACK,
+        }.get(record_type)
+        if layout is None:
+            raise ValueError(f"corrupted journal: unknown record type {record_type} at {offset}")
+        return layout.unpack_from(self._data, offset), offset + layout.size
+
+    def _read_keyframe(self, offset: int) -> Tuple[Dict[str, Any], int]:
+        values = _KEYFRAME.unpack_from(self._data, offset)
+        offset += _KEYFRAME.size
+
+        state = _empty_state()
+        state["day"], state["food"] = values[1], values[2]
+        queen = state["queen"]
+        queen["age"], queen["health"], queen["eggs_laid"] = values[3:6]
+        queen["is_alive"] = bool(values[-1])
+        state["workers"], state["soldiers"] = values[6:8]
+        state["larvae"] = dict(zip(CASTES, values[8:11]))
+        state["pupae"] = dict(zip(CASTES, values[11:14]))
+        (state["total_deaths"], state["attacks"], state["successful_defenses"],
+         state["food_lost"], state["ants_lost"], cause_count) = values[14:20]
+
+        for _ in range(cause_count):
+            code, count = struct.unpack_from("<BI", self._data, offset)
+            offset += 5
+            state["deaths_by_cause"][self._causes[code]] = count
+        return state, offset
+
+    def _apply(self, state: Dict[str, Any], record_type: int, record: tuple) -> None:
+        if record_type == REC_DAY:
+            _apply_day(state, record[1], record[2], record[3])
+        elif record_type == REC_EGGS:
+            state["queen"]["eggs_laid"] += record[2]
+        elif record_type == REC_LARVA:
+            state["larvae"][CASTES[record[2]]] += 1
+        elif record_type == REC_PUPATE:
+            caste = CASTES[record[2]]
+            state["larvae"][caste] -= 1
+            state["pupae"][caste] += 1
+        elif record_type == REC_HATCH:
+            _apply_hatch(state, CASTES[record[2]])
+        elif record_type == REC_DEATH:
+            future_type = CASTES[record[3]] if record[3] != _NO_CASTE else None
+            _apply_death(state, record[2], future_type, self._causes[record[4]], record[5])
+        elif record_type == REC_ATTACK:
+            _apply_attack(state, bool(record[5]), record[6], record[7])
+
+    def _describe(self, record_type: int, record: tuple) -> Dict[str, Any]:
+        if record_type == REC_EGGS:
+            return {"count": record[2]}
+        if record_type in (REC_LARVA, REC_PUPATE, REC_HATCH):
+            return {"future_type": CASTES[record[2]]}
+        if record_type == REC_DEATH:
+            return {
+                "kind": record[2],
+                "future_type": CASTES[record[3]] if record[3] != _NO_CASTE else None,
+                "cause": self._causes[record[4]],
+                "age": record[5],
+            }
+        return {
+            "severity": record[2],
+            "strength": record[3],
+            "attacker": ATTACKERS[record[4]],
+            "success": bool(record[5]),
+            "food_lost": record[6],
+            "ants_lost": record[7],
+        }
+
+
+def _apply_day(state: Dict[str, Any], day: int, food: int, queen_health: int) -> None:
+    state["day"] = day
+    state["food"] = food
+    queen = state["queen"]
+    queen["health"] = queen_health
+    if queen["is_alive"]:
+        queen["age"] += 1
+
+
+def _apply_hatch(state: Dict[str, Any], future_type: str) -> None:
+    state["pupae"][future_type] -= 1
+    if future_type == "worker":
+        state["workers"] += 1
+    elif future_type == "soldier":
+        state["soldiers"] += 1
+
+
+def _apply_death(state: Dict[str, Any], kind: int, future_type: Optional[str], cause: str, age: int) -> None:
+    state["total_deaths"] += 1
+    state["deaths_by_cause"][cause] = state["deaths_by_cause"].get(cause, 0) + 1
+    if kind == KIND_QUEEN:
+        state["queen"]["is_alive"] = False
+        state["queen"]["age"] = age
+    elif kind == KIND_WORKER:
+        state["workers"] -= 1
+    elif kind == KIND_SOLDIER:
+        state["soldiers"] -= 1
+    elif kind == KIND_LARVA:
+        state["larvae"][future_type] -= 1
+    elif kind == KIND_PUPA:
+        state["pupae"][future_type] -= 1
+
+
+def _apply_attack(state: Dict[str, Any], success: bool, food_lost: int, ants_lost: int) -> None:
+    state["attacks"] += 1
+    state["successful_defenses"] += int(success)
+    state["food_lost"] += food_lost
+    state["ants_lost"] += ants_lost
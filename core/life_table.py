@@ -0,0 +1,224 @@
+import json
+import mmap
+import operator
+import os
+from collections import Counter, defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+
+from core.journal import CASTES, KIND_QUEEN, KIND_WORKER, KIND_SOLDIER, KIND_LARVA, KIND_PUPA, death_kind
+
+COLUMNS = (
+    ("run", "i"),
+    ("birth", "i"),
+    ("end", "i"),
+    ("caste", "B"),
+    ("future", "B"),
+    ("cause", "B"),
+)
+
+KINDS = {
+    "queen": KIND_QUEEN,
+    "worker": KIND_WORKER,
+    "soldier": KIND_SOLDIER,
+    "larva": KIND_LARVA,
+    "pupa": KIND_PUPA,
+}
+
+CENSORED = 0
+_NO_FUTURE = 255
+_META = "meta.json"
+
+
+def _column_path(directory: str, name: str, fmt: str) -> str:
+    return os.path.join(directory, f"{name}.{fmt}")
+
+
+class LifeTableWriter:
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        meta_path = os.path.join(directory, _META)
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        else:
+            meta = {"rows": 0, "runs": 0, "causes": ["цензурировано"]}
+
+        self.rows = meta["rows"]
+        self.runs = meta["runs"]
+        self.causes: List[str] = meta["causes"]
+        self._cause_codes = {cause: code for code, cause in enumerate(self.causes)}
+        self.run = self.runs
+        self._files = {
+            name: open(_column_path(directory, name, fmt), "ab")
+            for name, fmt in COLUMNS
+        }
+
+    def begin_run(self) -> int:
+        self.run = self.runs
+        self.runs += 1
+        return self.run
+
+    def record(self, ant, day: int, cause: Optional[str]) -> None:
+        code = CENSORED if cause is None else self._cause_code(cause)
+        future_type = getattr(ant, "future_type", None)
+        future = CASTES.index(future_type) if future_type in CASTES else _NO_FUTURE
+
+        files = self._files
+        files["run"].write(self.run.to_bytes(4, "little", signed=True))
+        files["birth"].write(ant.birth_day.to_bytes(4, "little", signed=True))
+        files["end"].write(day.to_bytes(4, "little", signed=True))
+        files["caste"].write(bytes((death_kind(ant),)))
+        files["future"].write(bytes((future,)))
+        files["cause"].write(bytes((code,)))
+        self.rows += 1
+
+    def finalize(self, colony) -> None:
+        ants = [colony.queen] + colony.workers + colony.soldiers + colony.larvae + colony.pupae
+        for ant in ants:
+            for _ in range(ant.count):
+                if ant.is_alive():
+                    self.record(ant, colony.day, None)
+                elif ant is not colony.queen and ant.death_cause:
+                    self.record(ant, ant.death_day if ant.death_day is not None else colony.day, ant.death_cause)
+
+    def flush(self) -> None:
+        for f in self._files.values():
+            f.flush()
+        with open(os.path.join(self.directory, _META), "w", encoding="utf-8") as f:
+            json.dump({"rows": self.rows, "runs": self.runs, "causes": self.causes}, f, ensure_ascii=False)
+
+    def close(self) -> None:
+        self.flush()
+        for f in self._files.values():
+            f.close()
+
+    def __enter__(self) -> 'LifeTableWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _cause_code(self, cause: str) -> int:
+        code = self._cause_codes.get(cause)
+        if code is None:
+            code = len(self.causes)
+            if code > 0xFF:
+                raise ValueError("too many distinct death causes for the life table")
+            self.causes.append(cause)
+            self._cause_codes[cause] = code
+        return code
+
+
+class LifeTable:
+    def __init__(self, directory: str, chunk_size: int = 1 << 20):
+        self.directory = directory
+        self.chunk_size = chunk_size
+
+        with open(os.path.join(directory, _META), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.rows: int = meta["rows"]
+        self.runs: int = meta["runs"]
+        self.causes: List[str] = meta["causes"]
+
+        self._maps = []
+        self._views = []
+        self._columns = {}
+        self._counts: Optional[Counter] = None
+        for name, fmt in COLUMNS:
+            if self.rows == 0:
+                self._columns[name] = memoryview(b"").cast(fmt)
+                continue
+            with open(_column_path(directory, name, fmt), "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            raw = memoryview(data)
+            typed = raw.cast(fmt)
+            # Читатель видит только строки, записанные до последнего flush
+            self._columns[name] = typed[:self.rows]
+            self._maps.append(data)
+            self._views.extend((self._columns[name], typed, raw))
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        for data in self._maps:
+            data.close()
+
+    def __enter__(self) -> 'LifeTable':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _histogram(self) -> Counter:
+        # Один проход по колонкам дает счетчики для всех каст и причин; фильтры работают уже по нему
+        if self._counts is None:
+            counts = Counter()
+            columns = self._columns
+            for start in range(0, self.rows, self.chunk_size):
+                stop = min(start + self.chunk_size, self.rows)
+                counts.update(zip(
+                    columns["caste"][start:stop], columns["future"][start:stop], columns["cause"][start:stop],
+                    map(operator.sub, columns["end"][start:stop], columns["birth"][start:stop])
+                ))
+            self._counts = counts
+        return self._counts
+
+    def duration_counts(
+            self,
+            caste: Optional[str] = None,
+            cause: Optional[str] = None,
+            future_type: Optional[str] = None
+    ) -> Tuple[Dict[int, int], Dict[int, int]]:
+        caste_code = KINDS[caste] if caste is not None else None
+        future_code = CASTES.index(future_type) if future_type is not None else None
+        cause_code = self.causes.index(cause) if cause is not None else None
+
+        events = defaultdict(int)
+        censored = defaultdict(int)
+        for (row_caste, row_future, row_cause, duration), count in self._histogram().items():
+            if caste_code is not None and row_caste != caste_code:
+                continue
+            if future_code is not None and row_future != future_code:
+                continue
+            # Для причинно-специфичных кривых смерть от других причин цензурирует наблюдение
+            if row_cause == CENSORED or (cause_code is not None and row_cause != cause_code):
+                censored[duration] += count
+            else:
+                events[duration] += count
+        return dict(events), dict(censored)
+
+    def kaplan_meier(self, **filters) -> List[Dict[str, Any]]:
+        events, censored = self.duration_counts(**filters)
+        at_risk = sum(events.values()) + sum(censored.values())
+        survival = 1.0
+
+        curve = []
+        for age in sorted(set(events) | set(censored)):
+            deaths = events.get(age, 0)
+            if deaths:
+                survival *= 1 - deaths / at_risk
+            curve.append({"age": age, "at_risk": at_risk, "deaths": deaths, "survival": survival})
+            at_risk -= deaths + censored.get(age, 0)
+        return curve
+
+    def hazard(self, **filters) -> Dict[int, float]:
+        return {
+            point["age"]: point["deaths"] / point["at_risk"]
+            for point in self.kaplan_meier(**filters)
+            if point["at_risk"]
+        }
+
+    def age_at_death(self, **filters) -> Dict[int, int]:
+        events, _ = self.duration_counts(**filters)
+        return dict(sorted(events.items()))
+
+    def curves_by_caste(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {caste: self.kaplan_meier(caste=caste) for caste in KINDS}
+
+    def curves_by_cause(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {cause: self.kaplan_meier(cause=cause) for cause in self.causes[1:]}
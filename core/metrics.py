@@ -0,0 +1,185 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+
+from ants.group import head_count
+
+
+def resident_memory_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    # Запасной вариант вне Linux: пиковое, а не текущее потребление
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+RATE_WINDOW = 1.0
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsExporter:
+    def __init__(self, port: Optional[int] = None, path: Optional[str] = None,
+                 interval: float = 5.0, host: str = "127.0.0.1"):
+        self.port = port
+        self.path = path
+        self.interval = interval
+        self.host = host
+
+        # Пишет только поток симуляции: простые присваивания атомарны под GIL, блокировки не нужны
+        self.simulated_days = 0
+        self.ants_processed = 0
+        self.runs_completed = 0
+        self.deaths_by_cause: Dict[str, int] = {}
+        self.population: Dict[str, int] = {"queen": 0, "worker": 0, "soldier": 0, "larva": 0, "pupa": 0}
+        self.food = 0
+        self.queue_depth = 0
+
+        self._started = time.monotonic()
+        # Окно скорости ведет поток симуляции; render только читает, поэтому параллельные
+        # скрейперы не сбивают друг другу значения
+        self._rate_base = (self._started, 0, 0)
+        self._rate_mark = self._rate_base
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+
+    def record_death(self, cause: str) -> None:
+        self.deaths_by_cause[cause] = self.deaths_by_cause.get(cause, 0) + 1
+
+    def observe_day(self, colony) -> None:
+        population = {
+            "queen": int(colony.queen.is_alive()),
+            "worker": head_count(colony.workers),
+            "soldier": head_count(colony.soldiers),
+            "larva": len(colony.larvae),
+            "pupa": len(colony.pupae),
+        }
+        self.population = population
+        self.food = colony.food_storage
+        self.ants_processed += sum(population.values())
+        self.simulated_days += 1
+        self._advance_rate_window()
+
+    def observe_run(self, outcome: Dict[str, Any], include_days: bool = True) -> None:
+        self.runs_completed += 1
+        if include_days:
+            self.simulated_days += outcome["days"]
+            for cause, count in outcome["deaths_by_cause"].items():
+                self.deaths_by_cause[cause] = self.deaths_by_cause.get(cause, 0) + count
+            self._advance_rate_window()
+
+    def _advance_rate_window(self) -> None:
+        now = time.monotonic()
+        if now - self._rate_mark[0] >= RATE_WINDOW:
+            self._rate_base = self._rate_mark
+            self._rate_mark = (now, self.simulated_days, self.ants_processed)
+
+    def set_queue_depth(self, depth: int) -> None:
+        self.queue_depth = depth
+
+    def render(self) -> str:
+        now = time.monotonic()
+        days, ants = self.simulated_days, self.ants_processed
+        base_time, base_days, base_ants = self._rate_base
+        elapsed = now - base_time
+        days_rate = (days - base_days) / elapsed if elapsed > 0 else 0.0
+        ants_rate = (ants - base_ants) / elapsed if elapsed > 0 else 0.0
+
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        metric("antsim_simulated_days_total", "counter", "Simulated colony days.", [({}, days)])
+        metric("antsim_ants_processed_total", "counter", "Ant-days processed.", [({}, ants)])
+        metric("antsim_runs_completed_total", "counter", "Completed simulation runs.", [({}, self.runs_completed)])
+        metric("antsim_days_per_second", "gauge", "Simulated days per second over the last one to two seconds.",
+               [({}, f"{days_rate:.3f}")])
+        metric("antsim_ants_per_second", "gauge", "Ants processed per second over the last one to two seconds.",
+               [({}, f"{ants_rate:.3f}")])
+        metric("antsim_population", "gauge", "Live population of the latest colony day by caste.",
+               [({"caste": caste}, count) for caste, count in dict(self.population).items()])
+        metric("antsim_food", "gauge", "Food in storage on the latest colony day.", [({}, self.food)])
+        metric("antsim_deaths_total", "counter", "Deaths by cause.",
+               [({"cause": cause}, count) for cause, count in dict(self.deaths_by_cause).items()])
+        metric("antsim_queue_depth", "gauge", "Runs waiting in the batch queue.", [({}, self.queue_depth)])
+        metric("antsim_resident_memory_bytes", "gauge", "Resident set size of the process.",
+               [({}, resident_memory_bytes())])
+        metric("antsim_uptime_seconds", "gauge", "Seconds since the exporter was created.",
+               [({}, f"{now - self._started:.1f}")])
+        return "\n".join(lines) + "\n"
+
+    def start(self) -> 'MetricsExporter':
+        if self.port is not None:
+            self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+            self.port = self._server.server_address[1]
+            self._spawn(self._server.serve_forever)
+        if self.path is not None:
+            self._spawn(self._write_periodically)
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join()
+        if self.path is not None:
+            self.write_file()
+
+    def __enter__(self) -> 'MetricsExporter':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def write_file(self) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, self.path)
+
+    def _write_periodically(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.write_file()
+
+    def _spawn(self, target) -> None:
+        thread = threading.Thread(target=target, name="antsim-metrics", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _handler(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,293 @@
+import dataclasses
+import json
+import os
+import random
+from multiprocessing import Pool
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from core.batch import append_sweep_record, load_sweep, run_simulation, summarize
+from core.config import SimulationConfig
+
+SEARCH_SPACE: Dict[str, Tuple[float, float]] = {
+    "disease_chance": (0.0, 1.0),
+    "injury_chance": (0.0, 1.0),
+    "old_age_death_chance": (0.0, 1.0),
+    "hunger_damage": (1, 50),
+    "hunger_threshold": (20, 200),
+    "queen_egg_laying_chance": (0.0, 1.0),
+    "queen_egg_laying_interval": (1, 10),
+    "queen_egg_min_count": (1, 10),
+    "queen_egg_max_count": (1, 15),
+    "larva_growth_duration": (1, 10),
+    "pupa_growth_duration": (1, 10),
+    "larva_starvation_chance": (0.0, 1.0),
+    "worker_chance": (0.0, 1.0),
+    "soldier_chance": (0.0, 1.0),
+    "initial_workers": (5, 100),
+    "initial_food": (0, 500),
+    "queen_max_age": (20, 200),
+    "worker_max_age": (10, 100),
+    "soldier_max_age": (10, 100),
+    "attack_chance": (0.0, 1.0),
+    "min_days_for_attack": (0, 30),
+}
+
+
+def _evaluate_task(task) -> Dict[str, Any]:
+    return run_simulation(*task)
+
+
+def pareto_front(records: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def survival(record):
+        return 1.0 - record["collapse_rate"]
+
+    front = []
+    for record in records:
+        dominated = any(
+            survival(other) >= survival(record) and other["mean_population"] >= record["mean_population"]
+            and (survival(other) > survival(record) or other["mean_population"] > record["mean_population"])
+            for other in records
+        )
+        if not dominated:
+            front.append(record)
+    return sorted(front, key=lambda r: (-survival(r), -r["mean_population"]))
+
+
+class EvolutionaryOptimizer:
+    def __init__(
+            self,
+            base_config: SimulationConfig,
+            days: int,
+            seeds: Sequence[int] = tuple(range(20)),
+            space: Optional[Dict[str, Tuple[float, float]]] = None,
+            population_size: int = 24,
+            min_survival: float = 0.99,
+            cache_path: Optional[str] = None,
+            checkpoint_path: Optional[str] = None,
+            processes: Optional[int] = None,
+            seed: Optional[int] = None,
+            mutation_rate: float = 0.2,
+            elite: int = 2
+    ):
+        space = dict(space or SEARCH_SPACE)
+        unknown = [name for name in space if not hasattr(base_config, name)]
+        if unknown:
+            raise ValueError(f"unknown SimulationConfig fields: {', '.join(unknown)}")
+        if population_size < 2:
+            raise ValueError("population_size must be at least 2")
+
+        self.base_config = base_config
+        self.days = days
+        self.seeds = list(seeds)
+        self.space = space
+        self.population_size = population_size
+        self.min_survival = min_survival
+        self.cache_path = cache_path
+        self.checkpoint_path = checkpoint_path
+        self.processes = processes
+        self.mutation_rate = mutation_rate
+        self.elite = min(elite, population_size)
+
+        self.rng = random.Random(seed)
+        self.generation = 0
+        self.population: List[Dict[str, Any]] = []
+        self.evaluated: Dict[str, Dict[str, Any]] = {}
+        self.simulated = 0
+        self.history: List[Dict[str, Any]] = []
+
+        if cache_path:
+            self._add_cached(load_sweep(cache_path))
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            self._load_checkpoint()
+
+    def run(self, generations: int) -> Dict[str, Any]:
+        if not self.population:
+            self.population = [self._random_candidate() for _ in range(self.population_size)]
+
+        pool = Pool(self.processes) if self.processes != 1 else None
+        try:
+            while self.generation < generations:
+                records = self._evaluate(self.population, pool)
+                ranked = sorted(records, key=self._rank_key, reverse=True)
+                self.history.append({
+                    "generation": self.generation,
+                    "best": ranked[0],
+                    "feasible": sum(self._feasible(r) for r in records),
+                })
+                self.generation += 1
+                self.population = self._next_population(ranked)
+                self._save_checkpoint()
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        return self.result()
+
+    def result(self) -> Dict[str, Any]:
+        records = list(self.evaluated.values())
+        feasible = [r for r in records if self._feasible(r)]
+        return {
+            "best": max(feasible, key=self._rank_key) if feasible else None,
+            "pareto_front": pareto_front(records),
+            "generations": self.generation,
+            "evaluations": len(records),
+            "simulated": self.simulated,
+            "history": self.history,
+        }
+
+    def _feasible(self, record: Dict[str, Any]) -> bool:
+        return 1.0 - record["collapse_rate"] >= self.min_survival
+
+    def _rank_key(self, record: Dict[str, Any]) -> Tuple:
+        # Допустимые решения всегда лучше недопустимых; недопустимые тянутся к ограничению по выживаемости
+        survival = 1.0 - record["collapse_rate"]
+        if self._feasible(record):
+            return 1, record["mean_population"], survival
+        return 0, survival, record["mean_population"]
+
+    def _key(self, overrides: Dict[str, Any]) -> str:
+        return json.dumps(overrides, sort_keys=True)
+
+    def _canonical(self, overrides: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: overrides.get(name, getattr(self.base_config, name)) for name in self.space}
+
+    def _add_cached(self, records: List[Dict[str, Any]]) -> None:
+        for record in records:
+            if record.get("days") != self.days or record.get("runs") != len(self.seeds):
+                continue
+            if not set(record["overrides"]) <= set(self.space):
+                continue
+            overrides = self._canonical(record["overrides"])
+            self.evaluated[self._key(overrides)] = dict(record, overrides=overrides)
+
+    def _evaluate(self, candidates: List[Dict[str, Any]], pool) -> List[Dict[str, Any]]:
+        pending: Dict[str, Dict[str, Any]] = {}
+        for overrides in candidates:
+            key = self._key(overrides)
+            if key not in self.evaluated:
+                pending[key] = overrides
+
+        # Все прогоны поколения идут в пул одним списком, чтобы процессы не простаивали между кандидатами
+        tasks = [(dataclasses.replace(self.base_config, **overrides), self.days, seed)
+                 for overrides in pending.values() for seed in self.seeds]
+        if pool:
+            workers = self.processes or os.cpu_count() or 1
+            outcomes = pool.map(_evaluate_task, tasks, chunksize=max(1, len(tasks) // (4 * workers)))
+        else:
+            outcomes = [_evaluate_task(task) for task in tasks]
+        self.simulated += len(tasks)
+
+        runs = len(self.seeds)
+        for index, (key, overrides) in enumerate(pending.items()):
+            record = {"overrides": overrides, "days": self.days}
+            record.update(summarize(outcomes[index * runs:(index + 1) * runs]))
+            self.evaluated[key] = record
+            if self.cache_path:
+                append_sweep_record(self.cache_path, record)
+        return [self.evaluated[self._key(overrides)] for overrides in candidates]
+
+    def _next_population(self, ranked: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        children = [dict(r["overrides"]) for r in ranked[:self.elite]]
+        while len(children) < self.population_size:
+            parent_a = self._tournament(ranked)
+            parent_b = self._tournament(ranked)
+            children.append(self._feasible_child(parent_a["overrides"], parent_b["overrides"]))
+        return children
+
+    def _tournament(self, ranked: List[Dict[str, Any]]) -> Dict[str, Any]:
+        a, b = self.rng.choice(ranked), self.rng.choice(ranked)
+        return a if self._rank_key(a) >= self._rank_key(b) else b
+
+    def _feasible_child(self, parent_a: Dict[str, Any], parent_b: Dict[str, Any]) -> Dict[str, Any]:
+        # validate() служит проверкой допустимости: недопустимые потомки перегенерируются, а не симулируются
+        for _ in range(100):
+            child = self._mutate(self._crossover(parent_a, parent_b))
+            if self._valid(child):
+                return child
+        return dict(parent_a)
+
+    def _random_candidate(self) -> Dict[str, Any]:
+        for _ in range(1000):
+            candidate = {name: self._cast(name, self.rng.uniform(low, high))
+                         for name, (low, high) in self.space.items()}
+            if self._valid(candidate):
+                return candidate
+        return self._canonical({})
+
+    def _crossover(self, parent_a: Dict[str, Any], parent_b: Dict[str, Any]) -> Dict[str, Any]:
+        child = {}
+        for name in self.space:
+            # Смешивающее скрещивание (BLX-0.5): потомок может выйти чуть за отрезок между родителями
+            low, high = sorted((parent_a[name], parent_b[name]))
+            spread = (high - low) * 0.5
+            child[name] = self._cast(name, self.rng.uniform(low - spread, high + spread))
+        return child
+
+    def _mutate(self, candidate: Dict[str, Any]) -> Dict[str, Any]:
+        for name, (low, high) in self.space.items():
+            if self.rng.random() < self.mutation_rate:
+                candidate[name] = self._cast(name, candidate[name] + self.rng.gauss(0, (high - low) * 0.1))
+        return candidate
+
+    def _cast(self, name: str, value: float):
+        low, high = self.space[name]
+        value = min(high, max(low, value))
+        if isinstance(getattr(self.base_config, name), int):
+            return int(round(value))
+        return round(value, 4)
+
+    def _valid(self, overrides: Dict[str, Any]) -> bool:
+        return dataclasses.replace(self.base_config, **overrides).validate() is None
+
+    def _save_checkpoint(self) -> None:
+        if not self.checkpoint_path:
+            return
+        state = {
+            "days": self.days,
+            "seeds": self.seeds,
+            "space": self.space,
+            "generation": self.generation,
+            "population": self.population,
+            "history": self.history,
+            "simulated": self.simulated,
+            "evaluated": list(self.evaluated.values()),
+            "rng_state": self.rng.getstate(),
+        }
+        tmp = f"{self.checkpoint_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp, self.checkpoint_path)
+
+    def _load_checkpoint(self) -> None:
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state["days"] != self.days or state["seeds"] != self.seeds or \
+                {name: list(bounds) for name, bounds in self.space.items()} != state["space"]:
+            raise ValueError("checkpoint was written for a different optimization setup")
+
+        self.generation = state["generation"]
+        self.population = state["population"]
+        self.history = state["history"]
+        self.simulated = state["simulated"]
+        self._add_cached(state["evaluated"])
+        version, internal, gauss_next = state["rng_state"]
+        self.rng.setstate((version, tuple(internal), gauss_next))
+
+
+def format_result(result: Dict[str, Any], min_survival: float = 0.99) -> str:
+    lines = [
+        f"Поколений: {result['generations']}, оценено конфигураций: {result['evaluations']}, "
+        f"прогонов симуляции: {result['simulated']}",
+    ]
+    best = result["best"]
+    if best is None:
+        lines.append(f"Нет конфигураций с выживаемостью не ниже {min_survival * 100:.0f}%")
+    else:
+        lines.append(f"Лучшая допустимая конфигурация: выживаемость {(1 - best['collapse_rate']) * 100:.1f}%, "
+                     f"население {best['mean_population']:.1f}")
+        for name, value in best["overrides"].items():
+            lines.append(f"  {name} = {value}")
+    lines.append("\nФронт Парето (выживаемость / население):")
+    for record in result["pareto_front"]:
+        lines.append(f"  {(1 - record['collapse_rate']) * 100:5.1f}%  {record['mean_population']:8.1f}")
+    return "\n".join(lines)
@@ -0,0 +1,112 @@
+import copy
+import math
+import random
+from typing import Callable, Dict, Any, Optional, Sequence
+
+from ants.group import head_count
+from core.batch import quiet_output, seed_simulation
+from core.colony import AntColony
+from core.config import SimulationConfig
+
+
+def danger_score(colony: AntColony) -> float:
+    if not colony.is_alive():
+        return 1.0
+    config = colony.config
+    food = 1 - min(1.0, colony.food_storage / max(1, config.initial_food))
+    soldiers = 1 - min(1.0, head_count(colony.soldiers) / max(1, config.initial_workers // 4))
+    population = 1 - min(1.0, colony.get_total_ants() / max(1, config.initial_workers + 1))
+    queen = 1 - colony.queen.health / 100
+    # Живая колония не должна достигать уровня 1.0, зарезервированного для гибели
+    return min(0.99, (food + soldiers + population + queen) / 4)
+
+
+class CollapseSplitting:
+    def __init__(
+            self,
+            config: SimulationConfig,
+            horizon: int,
+            levels: Sequence[float] = (0.3, 0.45, 0.6, 0.75, 0.9, 1.0),
+            trajectories_per_level: int = 100,
+            score: Callable[[AntColony], float] = danger_score,
+            seed: Optional[int] = None
+    ):
+        if list(levels) != sorted(levels) or levels[-1] != 1.0:
+            raise ValueError("levels must be increasing and end with 1.0 (colony collapse)")
+        self.config = config
+        self.horizon = horizon
+        self.levels = list(levels)
+        self.trajectories_per_level = trajectories_per_level
+        self.score = score
+        self.seed = seed
+        self.simulated_days = 0
+
+    def run(self) -> Dict[str, Any]:
+        seed_simulation(self.seed)
+        self.simulated_days = 0
+
+        with quiet_output():
+            starts = [AntColony("splitting", self.config)]
+            stages = []
+            for level in self.levels:
+                entrances = []
+                for _ in range(self.trajectories_per_level):
+                    colony = copy.deepcopy(random.choice(starts))
+                    if self._advance(colony, level):
+                        entrances.append(colony)
+                stages.append({
+                    "level": level,
+                    "hits": len(entrances),
+                    "probability": len(entrances) / self.trajectories_per_level,
+                })
+                if not entrances:
+                    break
+                starts = entrances
+
+        probability = math.prod(stage["probability"] for stage in stages)
+        if len(stages) < len(self.levels):
+            probability = 0.0
+
+        # Приближение относительной ошибки в предположении независимости уровней
+        relative_variance = sum(
+            (1 - stage["probability"]) / (stage["probability"] * self.trajectories_per_level)
+            for stage in stages if stage["probability"] > 0
+        )
+        return {
+            "collapse_probability": probability,
+            "relative_error": math.sqrt(relative_variance) if probability > 0 else math.inf,
+            "stages": stages,
+            "simulated_days": self.simulated_days,
+            "horizon": self.horizon,
+        }
+
+    def _advance(self, colony: AntColony, level: float) -> bool:
+        if self.score(colony) >= level:
+            return True
+        while colony.day < self.horizon:
+            colony.simulate_day()
+            self.simulated_days += 1
+            if self.score(colony) >= level:
+                return True
+        return False
+
+
+def crude_collapse_probability(config: SimulationConfig, horizon: int, runs: int,
+                               seed: Optional[int] = None) -> Dict[str, Any]:
+    seed_simulation(seed)
+    collapses = 0
+    simulated_days = 0
+    with quiet_output():
+        for _ in range(runs):
+            colony = AntColony("monte-carlo", config)
+            while colony.day < horizon and colony.is_alive():
+                colony.simulate_day()
+                simulated_days += 1
+            collapses += not colony.is_alive()
+    probability = collapses / runs
+    return {
+        "collapse_probability": probability,
+        "relative_error": math.sqrt((1 - probability) / (probability * runs)) if collapses else math.inf,
+        "simulated_days": simulated_days,
+        "horizon": horizon,
+    }
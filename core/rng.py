@@ -0,0 +1,98 @@
+import contextlib
+import math
+import random
+from typing import Dict, List, Optional, Sequence
+
+STREAMS = ("attack", "combat", "caste", "disease", "injury", "old_age", "food", "eggs", "larva")
+
+
+class RandomStreams:
+    def __init__(self, seed: Optional[int] = None):
+        self.seed(seed)
+
+    def seed(self, seed: Optional[int] = None) -> None:
+        # Отдельный поток на каждый источник случайности: при одинаковом seed
+        # разные конфигурации получают одни и те же атаки, касты и болезни
+        for name in STREAMS:
+            setattr(self, name, random.Random(None if seed is None else f"{seed}:{name}"))
+
+    def getstate(self) -> Dict[str, tuple]:
+        return {name: getattr(self, name).getstate() for name in STREAMS}
+
+    def setstate(self, state: Dict[str, tuple]) -> None:
+        for name in STREAMS:
+            getattr(self, name).setstate(state[name])
+
+    @contextlib.contextmanager
+    def activated(self, state: Dict[str, tuple]):
+        # Временно подменяет состояние общих потоков; по выходе state содержит продолженное состояние
+        saved = self.getstate()
+        self.setstate(state)
+        try:
+            yield
+        finally:
+            state.update(self.getstate())
+            self.setstate(saved)
+
+
+def binomial(rng: random.Random, n: int, p: float) -> int:
+    if n <= 0 or p <= 0:
+        return 0
+    if p >= 1:
+        return n
+    if p > 0.5:
+        return n - binomial(rng, n, 1 - p)
+    if n * p < 10:
+        # Инверсия через геометрические промежутки между успехами: O(n*p) обращений к генератору
+        log_q = math.log(1 - p)
+        successes = position = 0
+        while True:
+            position += math.floor(math.log(1 - rng.random()) / log_q) + 1
+            if position > n:
+                return successes
+            successes += 1
+
+    # BTRS (Hörmann): преобразованная выборка с отклонением, O(1) в среднем
+    spq = math.sqrt(n * p * (1 - p))
+    b = 1.15 + 2.53 * spq
+    a = -0.0873 + 0.0248 * b + 0.01 * p
+    c = n * p + 0.5
+    vr = 0.92 - 4.2 / b
+    alpha = (2.83 + 5.1 / b) * spq
+    lpq = math.log(p / (1 - p))
+    mode = math.floor((n + 1) * p)
+    h = math.lgamma(mode + 1) + math.lgamma(n - mode + 1)
+    while True:
+        u = rng.random() - 0.5
+        us = 0.5 - abs(u)
+        k = math.floor((2 * a / us + b) * u + c)
+        if k < 0 or k > n:
+            continue
+        v = rng.random()
+        if us >= 0.07 and v <= vr:
+            return k
+        v *= alpha / (a / (us * us) + b)
+        if math.log(v) <= h - math.lgamma(k + 1) - math.lgamma(n - k + 1) + (k - mode) * lpq:
+            return k
+
+
+def split_draws(rng: random.Random, counts: Sequence[int], draws: int) -> List[int]:
+    # Многомерное гипергеометрическое разбиение: то же распределение, что у rng.sample по всей совокупности
+    remaining_population = sum(counts)
+    remaining_draws = draws
+    result = []
+    for good in counts:
+        taken = 0
+        population = remaining_population
+        for _ in range(remaining_draws):
+            if rng.random() * population < good:
+                taken += 1
+                good -= 1
+            population -= 1
+        result.append(taken)
+        remaining_draws -= taken
+        remaining_population -= good + taken
+    return result
+
+
+streams = RandomStreams()
@@ -0,0 +1,571 @@
+import dataclasses
+import multiprocessing
+import random
+import threading
+from multiprocessing import shared_memory
+from typing import Dict, Any, List, Optional
+
+from ants.queen import QueenAnt
+from core.attack_event import AttackEvent
+from core.batch import quiet_output
+from core.config import SimulationConfig
+from core.event_store import EventStore
+from core.rng import split_draws, streams
+from core.statistics import CAUSES
+
+EMPTY = 0
+WORKER = 1
+SOLDIER = 2
+LARVA = 3
+PUPA = 4
+
+DISEASED = 1
+INJURED = 2
+OLD = 4
+
+CASTES = ["worker", "soldier", "drone"]
+
+_CAUSE_CODES = {cause: code for code, cause in enumerate(CAUSES)}
+_NO_CAUSE = -1
+
+_COLUMNS = (
+    ("kind", "b"),
+    ("future", "b"),
+    ("age", "i"),
+    ("hunger", "i"),
+    ("health", "i"),
+    ("growth", "i"),
+    ("flags", "b"),
+    ("pending", "b"),
+    ("birth", "i"),
+)
+
+# Поля управляющего блока шарда: первые заполняет родитель, остальные — воркер
+_CONTROL = (
+    "phase", "day",
+    "worker_kills", "soldier_kills", "soldier_loss_chance",
+    "larva_feed", "worker_feed", "soldier_feed", "new_larvae",
+    "food", "workers", "soldiers", "larvae", "pupae",
+    "future_workers", "future_soldiers", "free",
+)
+_FIELD = {name: index for index, name in enumerate(_CONTROL)}
+
+PHASE_STOP = 0
+PHASE_COLLECT = 1
+PHASE_GROW = 2
+
+
+class _Shard:
+    def __init__(self, index: int, shard_count: int, names: Dict[str, str], capacity: int,
+                 config: Dict[str, Any], seed: Optional[int]):
+        self.index = index
+        self.config = SimulationConfig(**config)
+        self.rng = random.Random(None if seed is None else f"{seed}:shard{index}")
+        self.low = capacity * index // shard_count
+        self.high = capacity * (index + 1) // shard_count
+
+        self._memory = [shared_memory.SharedMemory(name=names[name]) for name, _ in _COLUMNS]
+        self._memory.append(shared_memory.SharedMemory(name=names["control"]))
+        self._memory.append(shared_memory.SharedMemory(name=names["deaths"]))
+        self._views = []
+        for (name, fmt), memory in zip(_COLUMNS, self._memory):
+            setattr(self, name, self._view(memory, fmt))
+        self.control = self._view(self._memory[-2], "d")
+        self.deaths = self._view(self._memory[-1], "q")
+        self._control_base = index * len(_CONTROL)
+        self._deaths_base = index * len(CAUSES)
+
+        self.free = [i for i in range(self.high - 1, self.low - 1, -1) if self.kind[i] == EMPTY]
+
+    def _view(self, memory: shared_memory.SharedMemory, fmt: str) -> memoryview:
+        raw = memory.buf
+        view = raw.cast(fmt)
+        self._views.extend((view, raw))
+        return view
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        for memory in self._memory:
+            memory.close()
+
+    def get(self, field: str) -> float:
+        return self.control[self._control_base + _FIELD[field]]
+
+    def put(self, field: str, value: float) -> None:
+        self.control[self._control_base + _FIELD[field]] = value
+
+    def kill(self, slot: int, cause: str) -> None:
+        self.kind[slot] = EMPTY
+        self.pending[slot] = _NO_CAUSE
+        self.deaths[self._deaths_base + _CAUSE_CODES[cause]] += 1
+        self.free.append(slot)
+
+    def slots(self, kind: int) -> List[int]:
+        kinds = self.kind
+        return [i for i in range(self.low, self.high) if kinds[i] == kind]
+
+    def collect(self) -> None:
+        rng = self.rng
+        worker_kills = int(self.get("worker_kills"))
+        if worker_kills:
+            for slot in rng.sample(self.slots(WORKER), worker_kills):
+                self.kill(slot, "погиб при атаке")
+
+        soldier_kills = int(self.get("soldier_kills"))
+        if soldier_kills:
+            for slot in rng.sample(self.slots(SOLDIER), soldier_kills):
+                self.kill(slot, "погиб в бою")
+
+        loss_chance = self.get("soldier_loss_chance")
+        if loss_chance > 0:
+            for slot in self.slots(SOLDIER):
+                if rng.random() < loss_chance:
+                    self.kill(slot, "погиб в бою")
+
+        workers = self.slots(WORKER)
+        self.put("food", sum(rng.randint(1, 3) for _ in workers))
+        self.put("workers", len(workers))
+        self.put("soldiers", len(self.slots(SOLDIER)))
+
+    def grow(self) -> None:
+        config = self.config
+        day = int(self.get("day"))
+        self._feed(LARVA, int(self.get("larva_feed")), 15)
+        self._feed(WORKER, int(self.get("worker_feed")), 10)
+        self._feed(SOLDIER, int(self.get("soldier_feed")), 10)
+
+        for _ in range(int(self.get("new_larvae"))):
+            slot = self.free.pop()
+            self.kind[slot] = LARVA
+            self.future[slot] = self._determine_future_type()
+            self._reset(slot)
+            self.birth[slot] = day
+
+        threshold = config.hunger_threshold
+        for slot in self.slots(LARVA):
+            self.growth[slot] += 1
+            if self.hunger[slot] >= threshold and self.rng.random() < config.larva_starvation_chance:
+                self.kill(slot, "голод (личинка)")
+                continue
+            if self.growth[slot] >= config.larva_growth_duration:
+                self.kind[slot] = PUPA
+                self.growth[slot] = 0
+            if self._age_brood(slot):
+                self.kill(slot, "низкое здоровье (личинка)")
+
+        for slot in self.slots(PUPA):
+            if self.pending[slot] != _NO_CAUSE:
+                self.kill(slot, CAUSES[self.pending[slot]])
+                continue
+            if self._age_brood(slot):
+                self.pending[slot] = _CAUSE_CODES["низкое здоровье (личинка)"]
+            if self.growth[slot] >= config.pupa_growth_duration:
+                self._hatch(slot)
+
+        for kind, max_age in ((WORKER, config.worker_max_age), (SOLDIER, config.soldier_max_age)):
+            for slot in self.slots(kind):
+                cause = self._age_adult(slot, max_age)
+                if cause:
+                    self.kill(slot, cause)
+
+        self._report()
+
+    def _report(self) -> None:
+        kinds, futures = self.kind, self.future
+        counts = [0] * 5
+        future_workers = future_soldiers = 0
+        for i in range(self.low, self.high):
+            kind = kinds[i]
+            counts[kind] += 1
+            if kind == LARVA:
+                if futures[i] == 0:
+                    future_workers += 1
+                elif futures[i] == 1:
+                    future_soldiers += 1
+        self.put("workers", counts[WORKER])
+        self.put("soldiers", counts[SOLDIER])
+        self.put("larvae", counts[LARVA])
+        self.put("pupae", counts[PUPA])
+        self.put("future_workers", future_workers)
+        self.put("future_soldiers", future_soldiers)
+        self.put("free", counts[EMPTY])
+
+    def _feed(self, kind: int, quota: int, amount: int) -> None:
+        if quota <= 0:
+            return
+        threshold = self.config.hunger_threshold
+        for slot in self.slots(kind)[:quota]:
+            self.hunger[slot] = max(0, self.hunger[slot] - amount)
+            if self.hunger[slot] < threshold:
+                self.health[slot] = min(100, self.health[slot] + 5)
+
+    def _reset(self, slot: int) -> None:
+        self.age[slot] = 0
+        self.hunger[slot] = 0
+        self.health[slot] = 100
+        self.growth[slot] = 0
+        self.flags[slot] = 0
+        self.pending[slot] = _NO_CAUSE
+
+    def _determine_future_type(self) -> int:
+        rand = self.rng.random()
+        if rand < self.config.worker_chance:
+            return 0
+        if rand < self.config.worker_chance + self.config.soldier_chance:
+            return 1
+        return 2
+
+    def _hatch(self, slot: int) -> None:
+        future = self.future[slot]
+        if future == 2:
+            # Трутни покидают колонию, не попадая в статистику смертей
+            self.kind[slot] = EMPTY
+            self.free.append(slot)
+            return
+        self.kind[slot] = WORKER if future == 0 else SOLDIER
+        self._reset(slot)
+
+    def _age_brood(self, slot: int) -> bool:
+        config = self.config
+        self.age[slot] += 1
+        self.hunger[slot] += 15
+        if self.hunger[slot] >= config.hunger_threshold:
+            self.health[slot] = max(0, self.health[slot] - config.hunger_damage * 2)
+        return self.health[slot] <= 0
+
+    def _age_adult(self, slot: int, max_age: int) -> Optional[str]:
+        # Повторяет Ant.age_one_step, включая перезапись причины смерти последующими проверками
+        config, rng = self.config, self.rng
+        cause = None
+        self.age[slot] += 1
+        self.hunger[slot] += 10
+
+        if self.hunger[slot] >= config.hunger_threshold:
+            self.health[slot] = max(0, self.health[slot] - config.hunger_damage)
+            if self.health[slot] <= 0:
+                cause = "голод"
+
+        if rng.random() < config.disease_chance:
+            self.flags[slot] |= DISEASED
+            self.health[slot] = max(0, self.health[slot] - 10)
+            if self.health[slot] <= 0:
+                cause = "болезнь"
+
+        if rng.random() < config.injury_chance:
+            self.flags[slot] |= INJURED
+            self.health[slot] = max(0, self.health[slot] - 15)
+            if self.health[slot] <= 0:
+                cause = "травма"
+
+        if cause is None:
+            if self.age[slot] >= max_age:
+                self.flags[slot] |= OLD
+            if self.flags[slot] & OLD and rng.random() < config.old_age_death_chance:
+                cause = "старость"
+            elif self.health[slot] <= 0:
+                cause = "низкое здоровье"
+        return cause
+
+
+def _shard_main(index: int, shard_count: int, names: Dict[str, str], capacity: int,
+                config: Dict[str, Any], seed: Optional[int], barrier) -> None:
+    shard = _Shard(index, shard_count, names, capacity, config, seed)
+    try:
+        while True:
+            barrier.wait()
+            phase = int(shard.get("phase"))
+            if phase == PHASE_STOP:
+                break
+            if phase == PHASE_COLLECT:
+                shard.collect()
+            else:
+                shard.grow()
+            barrier.wait()
+    except BaseException:
+        # Сломанный барьер сразу будит родителя, а не оставляет его ждать таймаута
+        barrier.abort()
+        raise
+    finally:
+        shard.close()
+
+
+class ShardedColony:
+    def __init__(self, name: str, config: SimulationConfig, shards: int = 4, capacity: int = 100_000,
+                 seed: Optional[int] = None, timeout: float = 60.0):
+        if error := config.validate():
+            raise ValueError(f"invalid configuration: {error}")
+        if capacity < config.initial_workers:
+            raise ValueError("capacity is smaller than the initial population")
+
+        self.name = name
+        self.config = config
+        self.shard_count = shards
+        self.capacity = capacity
+        self.timeout = timeout
+        self.day = 0
+        self.food_storage = config.initial_food
+        self.events_log = EventStore()
+        self.queen = QueenAnt(config)
+        self.queen_deaths: Dict[str, int] = {}
+
+        self._memory: Dict[str, shared_memory.SharedMemory] = {}
+        self._views: List[memoryview] = []
+        columns = {}
+        for name_, fmt in _COLUMNS:
+            columns[name_] = self._allocate(name_, fmt, capacity)
+        self.control = self._allocate("control", "d", shards * len(_CONTROL))
+        self.deaths = self._allocate("deaths", "q", shards * len(CAUSES))
+        for i in range(capacity):
+            columns["pending"][i] = _NO_CAUSE
+
+        self._counts = [dict.fromkeys(("workers", "soldiers", "larvae", "pupae", "free"), 0) for _ in range(shards)]
+        for i in range(config.initial_workers):
+            shard = i % shards
+            slot = capacity * shard // shards + i // shards
+            columns["kind"][slot] = WORKER
+            columns["health"][slot] = 100
+            self._counts[shard]["workers"] += 1
+        for shard in range(shards):
+            self._counts[shard]["free"] = self._shard_size(shard) - self._counts[shard]["workers"]
+        self._future_counts = {"worker": 0, "soldier": 0}
+        del columns
+
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        names = {name_: memory.name for name_, memory in self._memory.items()}
+        self._barrier = context.Barrier(shards + 1)
+        self._processes = [
+            context.Process(
+                target=_shard_main,
+                args=(index, shards, names, capacity, dataclasses.asdict(config), seed, self._barrier),
+                daemon=True
+            )
+            for index in range(shards)
+        ]
+        for process in self._processes:
+            process.start()
+        self._closed = False
+
+    def _allocate(self, name: str, fmt: str, length: int) -> memoryview:
+        itemsize = memoryview(b"\0" * 8).cast(fmt).itemsize
+        memory = shared_memory.SharedMemory(create=True, size=max(1, length) * itemsize)
+        memory.buf[:] = b"\0" * memory.size
+        self._memory[name] = memory
+        raw = memory.buf
+        view = raw[:length * itemsize].cast(fmt)
+        self._views.extend((view, raw))
+        return view
+
+    def _shard_size(self, shard: int) -> int:
+        return (self.capacity * (shard + 1) // self.shard_count) - (self.capacity * shard // self.shard_count)
+
+    def _set(self, shard: int, field: str, value: float) -> None:
+        self.control[shard * len(_CONTROL) + _FIELD[field]] = value
+
+    def _get(self, shard: int, field: str) -> float:
+        return self.control[shard * len(_CONTROL) + _FIELD[field]]
+
+    def _run_phase(self, phase: int) -> None:
+        for shard in range(self.shard_count):
+            self._set(shard, "phase", phase)
+            self._set(shard, "day", self.day)
+        self._wait()
+        self._wait()
+
+    def _wait(self) -> None:
+        # Фаза шарда не должна длиться дольше timeout; упавший или убитый процесс ломает барьер
+        try:
+            self._barrier.wait(self.timeout)
+        except threading.BrokenBarrierError:
+            self._barrier.abort()
+            failed = [f"{index} (exit code {process.exitcode})"
+                      for index, process in enumerate(self._processes) if not process.is_alive()]
+            self._shutdown(graceful=False)
+            if failed:
+                raise RuntimeError(f"shard processes failed: {', '.join(failed)}") from None
+            raise RuntimeError(f"shard phase timed out after {self.timeout} s") from None
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        for shard in range(self.shard_count):
+            self._set(shard, "phase", PHASE_STOP)
+        self._wait()
+        self._shutdown()
+
+    def _shutdown(self, graceful: bool = True) -> None:
+        self._closed = True
+        for process in self._processes:
+            if graceful:
+                process.join(self.timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for view in self._views:
+            view.release()
+        for memory in self._memory.values():
+            memory.close()
+            memory.unlink()
+
+    def __enter__(self) -> 'ShardedColony':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def simulate_day(self) -> None:
+        self.day += 1
+        for shard in range(self.shard_count):
+            for field in ("worker_kills", "soldier_kills", "soldier_loss_chance", "larva_feed",
+                          "worker_feed", "soldier_feed", "new_larvae"):
+                self._set(shard, field, 0)
+
+        if (self.day >= self.config.min_days_for_attack and
+                streams.attack.random() < self.config.attack_chance):
+            self._handle_attack(AttackEvent(self.config))
+
+        self._run_phase(PHASE_COLLECT)
+        for shard, counts in enumerate(self._counts):
+            counts["workers"] = int(self._get(shard, "workers"))
+            counts["soldiers"] = int(self._get(shard, "soldiers"))
+            self.food_storage += int(self._get(shard, "food"))
+
+        self._feed_colony()
+
+        with quiet_output():
+            eggs_laid = self.queen.work()
+        if eggs_laid > 0:
+            self._assign_larvae(eggs_laid)
+
+        self._run_phase(PHASE_GROW)
+        self._future_counts = {"worker": 0, "soldier": 0}
+        for shard, counts in enumerate(self._counts):
+            for field in counts:
+                counts[field] = int(self._get(shard, field))
+            self._future_counts["worker"] += int(self._get(shard, "future_workers"))
+            self._future_counts["soldier"] += int(self._get(shard, "future_soldiers"))
+
+        was_alive = self.queen.is_alive()
+        self.queen.age_one_step(self.day)
+        if was_alive and not self.queen.is_alive() and self.queen.death_cause:
+            self.queen_deaths[self.queen.death_cause] = self.queen_deaths.get(self.queen.death_cause, 0) + 1
+
+    def _handle_attack(self, attack: AttackEvent) -> None:
+        workers = self._total("workers")
+        soldiers = self._total("soldiers")
+        defense_strength = soldiers * 3 + workers * 0.5
+        if soldiers == 0:
+            defense_strength *= 0.3
+
+        ants_lost = 0
+        if defense_strength >= attack.strength:
+            success = True
+            food_lost = int(self.food_storage * 0.05 * attack.severity)
+            self.food_storage -= food_lost
+            for shard in range(self.shard_count):
+                self._set(shard, "soldier_loss_chance", 0.1 + 0.2 * attack.severity)
+        else:
+            success = False
+            food_lost_percentage = 0.3 + 0.4 * attack.severity if soldiers else 0.8
+            food_lost = int(self.food_storage * food_lost_percentage)
+            self.food_storage = max(0, self.food_storage - food_lost)
+            if workers:
+                lost = max(1, min(int(workers * (0.2 + 0.3 * attack.severity)), workers))
+                self._split_kills("workers", "worker_kills", lost)
+                ants_lost += lost
+            if soldiers:
+                lost = max(1, min(int(soldiers * (0.5 + 0.4 * attack.severity)), soldiers))
+                self._split_kills("soldiers", "soldier_kills", lost)
+                ants_lost += lost
+
+        self.events_log.append({
+            "day": self.day,
+            "type": "attack",
+            "success": success,
+            "food_lost": food_lost,
+            "ants_lost": ants_lost,
+            "description": attack.get_description(),
+        })
+
+    def _split_kills(self, population_field: str, kill_field: str, total_kills: int) -> None:
+        counts = [shard_counts[population_field] for shard_counts in self._counts]
+        for shard, kills in enumerate(split_draws(streams.combat, counts, total_kills)):
+            self._set(shard, kill_field, kills)
+
+    def _feed_colony(self) -> None:
+        queen_food_needed = 3
+        if self.food_storage >= queen_food_needed:
+            self.queen.receive_food(queen_food_needed)
+            self.food_storage -= queen_food_needed
+
+        for population_field, feed_field in (("larvae", "larva_feed"), ("workers", "worker_feed"),
+                                             ("soldiers", "soldier_feed")):
+            for shard, counts in enumerate(self._counts):
+                quota = min(self.food_storage, counts[population_field])
+                self._set(shard, feed_field, quota)
+                self.food_storage -= quota
+
+    def _assign_larvae(self, count: int) -> None:
+        free = [counts["free"] for counts in self._counts]
+        if count > sum(free):
+            raise RuntimeError(f"sharded colony capacity {self.capacity} exceeded")
+        assigned = [0] * self.shard_count
+        shard = self.day % self.shard_count
+        for _ in range(count):
+            while assigned[shard] >= free[shard]:
+                shard = (shard + 1) % self.shard_count
+            assigned[shard] += 1
+            shard = (shard + 1) % self.shard_count
+        for shard, value in enumerate(assigned):
+            self._set(shard, "new_larvae", value)
+
+    def _total(self, field: str) -> int:
+        return sum(counts[field] for counts in self._counts)
+
+    def deaths_by_cause(self) -> Dict[str, int]:
+        totals = dict(self.queen_deaths)
+        for shard in range(self.shard_count):
+            for code, cause in enumerate(CAUSES):
+                count = self.deaths[shard * len(CAUSES) + code]
+                if count:
+                    totals[cause] = totals.get(cause, 0) + count
+        return totals
+
+    def get_total_ants(self) -> int:
+        return int(self.queen.is_alive()) + self._total("workers") + self._total("soldiers")
+
+    def is_alive(self) -> bool:
+        return self.queen.is_alive() and self.get_total_ants() > 0
+
+    def get_statistics(self) -> Dict[str, Any]:
+        by_cause = self.deaths_by_cause()
+        total_deaths = sum(by_cause.values())
+        return {
+            "name": self.name,
+            "day": self.day,
+            "queen": {
+                "health": self.queen.health,
+                "age": self.queen.age,
+                "eggs_laid": self.queen.eggs_laid,
+                "is_alive": self.queen.is_alive(),
+                "death_info": self.queen.get_death_info() if not self.queen.is_alive() else None
+            },
+            "population": {
+                "workers": self._total("workers"),
+                "soldiers": self._total("soldiers"),
+                "larvae": self._total("larvae"),
+                "pupae": self._total("pupae"),
+                "total_live": self.get_total_ants(),
+                "total_ever_created": self.get_total_ants() + total_deaths
+            },
+            "larva_types": dict(self._future_counts),
+            "death_statistics": {"total_deaths": total_deaths, "by_cause": by_cause},
+            "resources": {"food": self.food_storage},
+            "events": {
+                "total_events": len(self.events_log),
+                "attack_events": self.events_log.attacks,
+                "successful_defenses": self.events_log.successful_defenses,
+                "recent_events": self.events_log.recent(5)
+            }
+        }
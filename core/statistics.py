@@ -0,0 +1,13 @@
+# Причины смерти, которые записывает модель; порядок задает коды в бинарных форматах
+CAUSES = [
+    "голод",
+    "болезнь",
+    "травма",
+    "старость",
+    "низкое здоровье",
+    "голод (личинка)",
+    "низкое здоровье (личинка)",
+    "погиб в бою",
+    "погиб при атаке",
+]
+OTHER_CAUSE = "другая причина"
@@ -0,0 +1,215 @@
+import math
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from core.batch import apply_overrides, append_sweep_record, load_sweep, run_ensemble, summarize
+from core.config import SimulationConfig
+
+
+def _cholesky(matrix: List[List[float]]) -> List[List[float]]:
+    n = len(matrix)
+    lower = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        row_i = lower[i]
+        for j in range(i + 1):
+            row_j = lower[j]
+            total = matrix[i][j] - sum(row_i[k] * row_j[k] for k in range(j))
+            if i == j:
+                if total <= 0:
+                    raise ValueError("kernel matrix is not positive definite")
+                row_i[j] = math.sqrt(total)
+            else:
+                row_i[j] = total / row_j[j]
+    return lower
+
+
+def _solve_lower(lower: List[List[float]], vector: Sequence[float]) -> List[float]:
+    result = []
+    for i, row in enumerate(lower):
+        result.append((vector[i] - sum(row[k] * result[k] for k in range(i))) / row[i])
+    return result
+
+
+def _solve_upper(lower: List[List[float]], vector: Sequence[float]) -> List[float]:
+    n = len(lower)
+    result = [0.0] * n
+    for i in reversed(range(n)):
+        total = vector[i] - sum(lower[k][i] * result[k] for k in range(i + 1, n))
+        result[i] = total / lower[i][i]
+    return result
+
+
+class GaussianProcess:
+    def __init__(self, lengthscale: float = 0.3, noise_variance: float = 1e-2):
+        self.lengthscale = lengthscale
+        self.noise_variance = noise_variance
+        self._inputs: List[List[float]] = []
+        self._lower: List[List[float]] = []
+        self._alpha: List[float] = []
+        self._offset = 0.0
+        self._scale = 1.0
+        self.log_likelihood = -math.inf
+
+    def kernel(self, a: Sequence[float], b: Sequence[float]) -> float:
+        distance = sum((x - y) ** 2 for x, y in zip(a, b))
+        return math.exp(-0.5 * distance / self.lengthscale ** 2)
+
+    def fit(
+            self,
+            inputs: List[List[float]],
+            targets: List[float],
+            target_variances: Optional[List[float]] = None
+    ) -> 'GaussianProcess':
+        n = len(targets)
+        self._offset = sum(targets) / n
+        self._scale = math.sqrt(sum((t - self._offset) ** 2 for t in targets) / n) or 1.0
+        scaled = [(t - self._offset) / self._scale for t in targets]
+        variances = target_variances or [0.0] * n
+
+        matrix = [[self.kernel(a, b) for b in inputs] for a in inputs]
+        for i in range(n):
+            matrix[i][i] += self.noise_variance + variances[i] / self._scale ** 2
+
+        self._inputs = inputs
+        self._lower = _cholesky(matrix)
+        self._alpha = _solve_upper(self._lower, _solve_lower(self._lower, scaled))
+        self.log_likelihood = (
+            -0.5 * sum(y * a for y, a in zip(scaled, self._alpha))
+            - sum(math.log(self._lower[i][i]) for i in range(n))
+            - 0.5 * n * math.log(2 * math.pi)
+        )
+        return self
+
+    def predict(self, point: Sequence[float]) -> Tuple[float, float]:
+        weights = [self.kernel(point, x) for x in self._inputs]
+        mean = sum(w * a for w, a in zip(weights, self._alpha))
+        v = _solve_lower(self._lower, weights)
+        variance = max(0.0, 1.0 - sum(x * x for x in v))
+        return self._offset + mean * self._scale, math.sqrt(variance) * self._scale
+
+
+def fit_gaussian_process(
+        inputs: List[List[float]],
+        targets: List[float],
+        target_variances: Optional[List[float]] = None,
+        lengthscales: Sequence[float] = (0.1, 0.2, 0.4, 0.8, 1.6),
+        noise_variances: Sequence[float] = (1e-4, 1e-3, 1e-2, 1e-1)
+) -> GaussianProcess:
+    best = None
+    for lengthscale in lengthscales:
+        for noise in noise_variances:
+            try:
+                model = GaussianProcess(lengthscale, noise).fit(inputs, targets, target_variances)
+            except ValueError:
+                continue
+            if best is None or model.log_likelihood > best.log_likelihood:
+                best = model
+    if best is None:
+        raise ValueError("could not fit a Gaussian process to the sweep results")
+    return best
+
+
+class ConfigEmulator:
+    TARGETS = ("collapse_rate", "mean_population")
+
+    def __init__(
+            self,
+            base_config: SimulationConfig,
+            fields: Sequence[str],
+            days: int,
+            sweep_path: Optional[str] = None,
+            seeds: Sequence[int] = tuple(range(20)),
+            max_std: Optional[Dict[str, float]] = None,
+            processes: Optional[int] = None
+    ):
+        unknown = [name for name in fields if not hasattr(base_config, name)]
+        if unknown:
+            raise ValueError(f"unknown SimulationConfig fields: {', '.join(unknown)}")
+
+        self.base_config = base_config
+        self.fields = list(fields)
+        self.days = days
+        self.sweep_path = sweep_path
+        self.seeds = list(seeds)
+        self.max_std = max_std or {"collapse_rate": 0.05, "mean_population": 5.0}
+        self.processes = processes
+
+        self.records: List[Dict[str, Any]] = []
+        self.models: Dict[str, GaussianProcess] = {}
+        self._bounds: List[Tuple[float, float]] = []
+
+        if sweep_path:
+            self.add_records(load_sweep(sweep_path))
+
+    def add_records(self, records: List[Dict[str, Any]]) -> None:
+        usable = [r for r in records if r.get("days") == self.days and set(r["overrides"]) <= set(self.fields)]
+        self.records.extend(usable)
+        if self.records:
+            self.fit()
+
+    def fit(self) -> None:
+        points = [self._raw_point(r["overrides"]) for r in self.records]
+        self._bounds = []
+        for column in zip(*points):
+            low, high = min(column), max(column)
+            self._bounds.append((low, high if high > low else low + 1.0))
+        inputs = [self._normalize(point) for point in points]
+
+        self.models = {}
+        for target in self.TARGETS:
+            values = [r[target] for r in self.records]
+            variances = [self._sampling_variance(r, target) for r in self.records]
+            self.models[target] = fit_gaussian_process(inputs, values, variances)
+
+    def predict(self, overrides: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+        if not self.models:
+            raise ValueError("emulator has no training data yet")
+        point = self._normalize(self._raw_point(overrides))
+        result = {}
+        for target, model in self.models.items():
+            mean, std = model.predict(point)
+            if target == "collapse_rate":
+                mean = min(1.0, max(0.0, mean))
+            result[target] = {"mean": mean, "std": std}
+        return result
+
+    def query(self, overrides: Dict[str, Any]) -> Dict[str, Any]:
+        unknown = set(overrides) - set(self.fields)
+        if unknown:
+            raise ValueError(f"emulator was not trained on: {', '.join(sorted(unknown))}")
+        config = apply_overrides(self.base_config, overrides)
+
+        if self.models and self._within_bounds(overrides):
+            prediction = self.predict(overrides)
+            if all(prediction[t]["std"] <= self.max_std[t] for t in self.TARGETS):
+                return {"overrides": overrides, "prediction": prediction, "source": "surrogate"}
+
+        record = {"overrides": overrides, "days": self.days}
+        record.update(summarize(run_ensemble(config, self.days, self.seeds, self.processes)))
+        if self.sweep_path:
+            append_sweep_record(self.sweep_path, record)
+        self.add_records([record])
+
+        prediction = {
+            target: {"mean": record[target], "std": math.sqrt(self._sampling_variance(record, target))}
+            for target in self.TARGETS
+        }
+        return {"overrides": overrides, "prediction": prediction, "source": "simulation"}
+
+    def _raw_point(self, overrides: Dict[str, Any]) -> List[float]:
+        return [float(overrides.get(name, getattr(self.base_config, name))) for name in self.fields]
+
+    def _within_bounds(self, overrides: Dict[str, Any]) -> bool:
+        # За пределами обученной области эмулятор не экстраполирует
+        return all(0.0 <= value <= 1.0 for value in self._normalize(self._raw_point(overrides)))
+
+    def _normalize(self, point: List[float]) -> List[float]:
+        return [(value - low) / (high - low) for value, (low, high) in zip(point, self._bounds)]
+
+    @staticmethod
+    def _sampling_variance(record: Dict[str, Any], target: str) -> float:
+        runs = max(1, record["runs"])
+        if target == "collapse_rate":
+            # Сглаживание Лапласа, чтобы 0 и 1 не считались точными значениями
+            p = (record["collapse_rate"] * runs + 1) / (runs + 2)
+            return p * (1 - p) / runs
+        return record.get("std_population", 0.0) ** 2 / runs
@@ -0,0 +1,212 @@
+import multiprocessing
+import queue
+from multiprocessing import shared_memory
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from ants.group import head_count
+from core.batch import colony_outcome, quiet_output, seed_simulation
+from core.colony import AntColony
+from core.config import SimulationConfig
+from core.statistics import CAUSES, OTHER_CAUSE
+
+RUN_FIELDS = ("seed", "days", "collapsed", "population", "workers", "soldiers", "food", "total_deaths", "attacks")
+DAY_FIELDS = ("population", "workers", "soldiers", "larvae", "pupae", "food", "deaths")
+
+# Последняя колонка собирает причины, которых нет в CAUSES
+_CAUSE_NAMES = CAUSES + [OTHER_CAUSE]
+_CAUSE_CODES = {cause: code for code, cause in enumerate(_CAUSE_NAMES)}
+_ITEM = 8
+_NO_SEED = -1
+
+# Буфер, к которому подключен процесс пула; задаётся инициализатором пула
+_worker_ring: Optional['ResultRing'] = None
+
+
+class ResultRing:
+    # Один блок shared memory, разбитый на колонки int64: поля прогона — по одному числу на слот,
+    # дневные ряды и причины смерти — строка фиксированной длины на слот
+    def __init__(self, capacity: int, days: int, name: Optional[str] = None):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.days = days
+        self._owner = name is None
+
+        length = capacity * (len(RUN_FIELDS) + len(_CAUSE_NAMES) + len(DAY_FIELDS) * max(1, days))
+        if self._owner:
+            self._memory = shared_memory.SharedMemory(create=True, size=length * _ITEM)
+            self._memory.buf[:] = b"\0" * self._memory.size
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+        self.name = self._memory.name
+
+        self._raw = self._memory.buf
+        self._flat = self._raw[:length * _ITEM].cast("q")
+        offset = 0
+        self.runs: Dict[str, memoryview] = {}
+        for field in RUN_FIELDS:
+            self.runs[field] = self._flat[offset:offset + capacity]
+            offset += capacity
+        self.deaths = self._flat[offset:offset + capacity * len(_CAUSE_NAMES)]
+        offset += capacity * len(_CAUSE_NAMES)
+        self.series: Dict[str, memoryview] = {}
+        for field in DAY_FIELDS:
+            self.series[field] = self._flat[offset:offset + capacity * days]
+            offset += capacity * max(1, days)
+        self._closed = False
+        self._unlinked = False
+
+    def close(self) -> None:
+        # Представления из day_series() и deaths_row() вызывающий освобождает сам до close(),
+        # иначе блок нельзя закрыть (BufferError); имя в /dev/shm удаляется в любом случае
+        if self._closed:
+            return
+        try:
+            for view in (*self.runs.values(), self.deaths, *self.series.values(), self._flat, self._raw):
+                view.release()
+            self._memory.close()
+        finally:
+            if self._owner and not self._unlinked:
+                self._unlinked = True
+                self._memory.unlink()
+        self._closed = True
+
+    def __enter__(self) -> 'ResultRing':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def day_series(self, field: str, slot: int) -> memoryview:
+        # Срез без копирования; заполнены первые runs["days"][slot] значений
+        return self.series[field][slot * self.days:(slot + 1) * self.days]
+
+    def deaths_row(self, slot: int) -> memoryview:
+        return self.deaths[slot * len(_CAUSE_NAMES):(slot + 1) * len(_CAUSE_NAMES)]
+
+    def outcome(self, slot: int) -> Dict[str, Any]:
+        # Копия слота в виде словаря run_simulation, для summarize и старого кода
+        record = {field: self.runs[field][slot] for field in RUN_FIELDS}
+        record["collapsed"] = bool(record["collapsed"])
+        if record["seed"] == _NO_SEED:
+            record["seed"] = None
+        row = self.deaths_row(slot)
+        record["deaths_by_cause"] = {cause: row[code] for code, cause in enumerate(_CAUSE_NAMES) if row[code]}
+        return record
+
+    def outcomes(self, slots: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        return [self.outcome(slot) for slot in (range(self.capacity) if slots is None else slots)]
+
+    def run_into(self, slot: int, config: SimulationConfig, seed: Optional[int] = None) -> int:
+        seed_simulation(seed)
+        days = self.days
+        base = slot * days
+        series = [self.series[field] for field in DAY_FIELDS]
+        with quiet_output():
+            colony = AntColony(f"run-{seed}", config)
+            for day in range(days):
+                colony.simulate_day()
+                values = (
+                    colony.get_total_ants(),
+                    head_count(colony.workers),
+                    head_count(colony.soldiers),
+                    len(colony.larvae),
+                    len(colony.pupae),
+                    colony.food_storage,
+                    colony.death_stats.total_deaths,
+                )
+                for column, value in zip(series, values):
+                    column[base + day] = value
+                if not colony.is_alive():
+                    break
+
+        # Поля прогона те же, что у run_simulation
+        outcome = colony_outcome(colony, seed)
+        outcome["seed"] = _NO_SEED if seed is None else seed
+        for field in RUN_FIELDS:
+            self.runs[field][slot] = outcome[field]
+        row = self.deaths_row(slot)
+        for code in range(len(_CAUSE_NAMES)):
+            row[code] = 0
+        for cause, count in outcome["deaths_by_cause"].items():
+            row[_CAUSE_CODES.get(cause, _CAUSE_CODES[OTHER_CAUSE])] += count
+        return slot
+
+
+def _attach(name: str, capacity: int, days: int) -> None:
+    global _worker_ring
+    _worker_ring = ResultRing(capacity, days, name=name)
+
+
+def _run_slot(task: Tuple[SimulationConfig, Optional[int], int]) -> int:
+    # Через очередь пула возвращается только номер слота
+    config, seed, slot = task
+    return _worker_ring.run_into(slot, config, seed)
+
+
+def _pool(ring: ResultRing, processes: Optional[int]):
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+    return context.Pool(processes, initializer=_attach, initargs=(ring.name, ring.capacity, ring.days))
+
+
+def run_ensemble_shared(
+        config: SimulationConfig,
+        days: int,
+        seeds: Iterable[int],
+        processes: Optional[int] = None
+) -> ResultRing:
+    # Слот i принадлежит i-му зерну; буфер закрывает вызывающий
+    seeds = list(seeds)
+    ring = ResultRing(max(1, len(seeds)), days)
+    tasks = [(config, seed, slot) for slot, seed in enumerate(seeds)]
+    try:
+        if processes == 1 or len(tasks) <= 1:
+            for task in tasks:
+                ring.run_into(task[2], task[0], task[1])
+        else:
+            with _pool(ring, processes) as pool:
+                for _ in pool.imap_unordered(_run_slot, tasks):
+                    pass
+    except BaseException:
+        ring.close()
+        raise
+    return ring
+
+
+def stream_ensemble(
+        config: SimulationConfig,
+        days: int,
+        seeds: Iterable[int],
+        processes: Optional[int] = None,
+        capacity: Optional[int] = None
+) -> Iterator[Tuple[int, ResultRing]]:
+    # Кольцо из capacity слотов: слот отдается воркеру повторно, только когда
+    # родитель вернулся за следующим результатом, поэтому представления слота
+    # действительны до следующей итерации и должны быть освобождены до выхода из цикла
+    seeds = iter(seeds)
+    if capacity is None:
+        capacity = 2 * (processes or multiprocessing.cpu_count())
+    with ResultRing(capacity, days) as ring, _pool(ring, processes) as pool:
+        done = queue.Queue()
+        in_flight = 0
+
+        def submit(slot: int) -> bool:
+            for seed in seeds:
+                pool.apply_async(_run_slot, ((config, seed, slot),), callback=done.put, error_callback=done.put)
+                return True
+            return False
+
+        for slot in range(capacity):
+            if not submit(slot):
+                break
+            in_flight += 1
+
+        while in_flight:
+            slot = done.get()
+            in_flight -= 1
+            if isinstance(slot, BaseException):
+                raise slot
+            yield slot, ring
+            if submit(slot):
+                in_flight += 1
@@ -0,0 +1,416 @@
+import argparse
+import dataclasses
+import itertools
+import json
+import os
+import socket
+import struct
+import threading
+import time
+import zlib
+from multiprocessing import Process
+from typing import Dict, Any, List, Optional, Iterable, Set, Tuple
+
+from core.batch import run_simulation
+from core.config import SimulationConfig
+from core.metrics import MetricsExporter
+
+BATCH_MAGIC = b"ANTR\x01"
+_BATCH_HEADER = struct.Struct("<I")
+_RESULT = struct.Struct("<IqiBiiiiii")  # job, seed, дни, гибель, население, рабочие, солдаты, пища, смерти, атаки
+_RESULT_FIELDS = ("job_id", "seed", "days", "collapsed", "population", "workers", "soldiers",
+                  "food", "total_deaths", "attacks")
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def encode_results(results: List[Dict[str, Any]]) -> bytes:
+    parts = [BATCH_MAGIC, _BATCH_HEADER.pack(len(results))]
+    for r in results:
+        parts.append(_RESULT.pack(*(int(r[name] or 0) for name in _RESULT_FIELDS)))
+    return b"".join(parts)
+
+
+def decode_results(data: bytes) -> List[Dict[str, Any]]:
+    if data[:len(BATCH_MAGIC)] != BATCH_MAGIC:
+        raise ValueError("not a result batch")
+    offset = len(BATCH_MAGIC)
+    count, = _BATCH_HEADER.unpack_from(data, offset)
+    offset += _BATCH_HEADER.size
+
+    results = []
+    for _ in range(count):
+        record = dict(zip(_RESULT_FIELDS, _RESULT.unpack_from(data, offset)))
+        record["collapsed"] = bool(record["collapsed"])
+        results.append(record)
+        offset += _RESULT.size
+    return results
+
+
+class QueueLayout:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.jobs = os.path.join(directory, "jobs")
+        self.leases = os.path.join(directory, "leases")
+        self.done = os.path.join(directory, "done")
+        self.failed = os.path.join(directory, "failed")
+        self.attempts = os.path.join(directory, "attempts")
+        self.results = os.path.join(directory, "results")
+        for path in (self.jobs, self.leases, self.done, self.failed, self.attempts, self.results):
+            os.makedirs(path, exist_ok=True)
+
+    def job_path(self, job_id: int) -> str:
+        return os.path.join(self.jobs, f"{job_id}.json")
+
+    def lease_path(self, job_id: int) -> str:
+        return os.path.join(self.leases, f"{job_id}.lease")
+
+    def job_ids(self) -> List[int]:
+        return sorted(int(name[:-5]) for name in os.listdir(self.jobs) if name.endswith(".json"))
+
+    def finished(self, job_id: int) -> bool:
+        return (os.path.exists(os.path.join(self.done, str(job_id))) or
+                os.path.exists(os.path.join(self.failed, str(job_id))))
+
+    def attempt_count(self, job_id: int) -> int:
+        prefix = f"{job_id}."
+        return len([name for name in os.listdir(self.attempts) if name.startswith(prefix)])
+
+    def add_attempt(self, job_id: int, reason: str) -> None:
+        name = f"{job_id}.{socket.gethostname()}.{os.getpid()}.{time.time_ns()}"
+        _write_atomic(os.path.join(self.attempts, name), reason.encode("utf-8"))
+
+
+class WorkQueue:
+    def __init__(self, directory: str, lease_timeout: float = 120.0, max_retries: int = 3):
+        self.layout = QueueLayout(directory)
+        self.lease_timeout = lease_timeout
+        self.max_retries = max_retries
+
+    def submit(self, config: SimulationConfig, days: int, seeds: Iterable[int],
+               overrides: Optional[Dict[str, Any]] = None) -> List[int]:
+        existing = self.layout.job_ids()
+        next_id = existing[-1] + 1 if existing else 0
+        job_ids = []
+        for job_id, seed in zip(itertools.count(next_id), seeds):
+            job = {
+                "job_id": job_id,
+                "config": dataclasses.asdict(config),
+                "overrides": overrides or {},
+                "days": days,
+                "seed": seed,
+                "lease_timeout": self.lease_timeout,
+                "max_retries": self.max_retries,
+            }
+            _write_atomic(self.layout.job_path(job_id), json.dumps(job, ensure_ascii=False).encode("utf-8"))
+            job_ids.append(job_id)
+        return job_ids
+
+    def submit_sweep(self, base_config: SimulationConfig, grid: Dict[str, List[Any]], days: int,
+                     seeds: Iterable[int]) -> List[int]:
+        seeds = list(seeds)
+        names = list(grid)
+        job_ids = []
+        for values in itertools.product(*(grid[name] for name in names)):
+            overrides = dict(zip(names, values))
+            job_ids.extend(self.submit(base_config, days, seeds, overrides))
+        return job_ids
+
+    def reap_expired(self, now: Optional[float] = None) -> List[int]:
+        now = time.time() if now is None else now
+        reclaimed = []
+        for name in os.listdir(self.layout.leases):
+            if not name.endswith(".lease"):
+                continue
+            job_id = int(name[:-6])
+            path = os.path.join(self.layout.leases, name)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    lease = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+            if self.layout.finished(job_id):
+                self._unlink(path)
+                continue
+            if lease["expires"] > now:
+                continue
+
+            self.layout.add_attempt(job_id, f"lease expired: {lease['worker']}")
+            if self.layout.attempt_count(job_id) > self.max_retries:
+                _write_atomic(os.path.join(self.layout.failed, str(job_id)), b"")
+            self._unlink(path)
+            reclaimed.append(job_id)
+        return reclaimed
+
+    def status(self) -> Dict[str, int]:
+        job_ids = self.layout.job_ids()
+        done = set(os.listdir(self.layout.done))
+        failed = set(os.listdir(self.layout.failed))
+        leased = {name[:-6] for name in os.listdir(self.layout.leases) if name.endswith(".lease")}
+        counts = {"total": len(job_ids), "done": 0, "failed": 0, "leased": 0, "pending": 0}
+        for job_id in map(str, job_ids):
+            if job_id in done:
+                counts["done"] += 1
+            elif job_id in failed:
+                counts["failed"] += 1
+            elif job_id in leased:
+                counts["leased"] += 1
+            else:
+                counts["pending"] += 1
+        return counts
+
+    def results(self) -> Dict[int, Dict[str, Any]]:
+        collected = {}
+        for name in sorted(os.listdir(self.layout.results)):
+            if not name.endswith(".bin"):
+                continue
+            with open(os.path.join(self.layout.results, name), "rb") as f:
+                for record in decode_results(f.read()):
+                    # Работу с истекшей арендой могли выполнить дважды: берем первый результат
+                    collected.setdefault(record["job_id"], record)
+        return collected
+
+    def wait(self, poll_interval: float = 0.5, timeout: Optional[float] = None,
+             metrics: Optional[MetricsExporter] = None) -> Dict[str, int]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.reap_expired()
+            counts = self.status()
+            if metrics:
+                metrics.set_queue_depth(counts["pending"] + counts["leased"])
+            if counts["done"] + counts["failed"] >= counts["total"]:
+                return counts
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"work queue did not finish: {counts}")
+            time.sleep(poll_interval)
+
+    @staticmethod
+    def _unlink(path: str) -> None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+class QueueWorker:
+    def __init__(self, directory: str, worker_id: Optional[str] = None, batch_size: int = 16,
+                 poll_interval: float = 0.5):
+        self.layout = QueueLayout(directory)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._batch_number = 0
+        self._pending: List[Tuple[int, Dict[str, Any], float]] = []
+        self._seen: Set[int] = set()
+        self._open: List[int] = []
+        # Текущий срок каждой нашей аренды и ее длительность; продлевает поток heartbeat
+        self._leases: Dict[int, Tuple[float, float]] = {}
+        self._lease_lock = threading.Lock()
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        # Каталог задач перечитывается, только когда известные открытые задачи кончились
+        job = self._claim_open()
+        if job is None and self._scan_new_jobs():
+            job = self._claim_open()
+        return job
+
+    def _scan_new_jobs(self) -> bool:
+        new_ids = [job_id for job_id in self.layout.job_ids() if job_id not in self._seen]
+        self._seen.update(new_ids)
+        self._open.extend(new_ids)
+        return bool(new_ids)
+
+    def _claim_open(self) -> Optional[Dict[str, Any]]:
+        if not self._open:
+            return None
+        # Разные воркеры начинают перебор с разных мест, чтобы реже бороться за одни задачи
+        start = zlib.crc32(self.worker_id.encode("utf-8")) % len(self._open)
+        finished = set()
+        claimed = None
+        for job_id in self._open[start:] + self._open[:start]:
+            if self.layout.finished(job_id):
+                finished.add(job_id)
+                continue
+            if os.path.exists(self.layout.lease_path(job_id)):
+                continue
+            with open(self.layout.job_path(job_id), encoding="utf-8") as f:
+                job = json.load(f)
+            if not self._acquire(job):
+                continue
+            # Задачу могли завершить между проверкой и захватом аренды
+            if self.layout.finished(job_id):
+                self._release(job_id)
+                finished.add(job_id)
+                continue
+            claimed = job
+            break
+        # Завершенные и проваленные задачи в работу не возвращаются, поэтому выпадают из кэша навсегда
+        if finished:
+            self._open = [job_id for job_id in self._open if job_id not in finished]
+        return claimed
+
+    def run(self, stop_when_idle: bool = True) -> int:
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(stop,), name="antsim-lease", daemon=True)
+        heartbeat.start()
+        try:
+            return self._run(stop_when_idle)
+        finally:
+            stop.set()
+            heartbeat.join()
+
+    def _run(self, stop_when_idle: bool) -> int:
+        processed = 0
+        while True:
+            job = self.claim()
+            if job is None:
+                self.flush()
+                if stop_when_idle:
+                    return processed
+                time.sleep(self.poll_interval)
+                continue
+
+            try:
+                result = self.execute(job)
+            except Exception as e:
+                self.layout.add_attempt(job["job_id"], f"{self.worker_id}: {e!r}")
+                if self.layout.attempt_count(job["job_id"]) > job["max_retries"]:
+                    _write_atomic(os.path.join(self.layout.failed, str(job["job_id"])), b"")
+                self._release(job["job_id"])
+                continue
+
+            self._pending.append((job["job_id"], result, job["lease_expires"]))
+            processed += 1
+            oldest_expiry = min(expires for _, _, expires in self._pending)
+            if len(self._pending) >= self.batch_size or time.time() > oldest_expiry - job["lease_timeout"] / 2:
+                self.flush()
+
+    def execute(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        config = SimulationConfig(**job["config"])
+        config = dataclasses.replace(config, **job["overrides"])
+        result = run_simulation(config, job["days"], job["seed"])
+        result["job_id"] = job["job_id"]
+        return result
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        # Если аренда истекла и задачу забрал другой воркер, наш результат устарел и отбрасывается
+        owned = [(job_id, result) for job_id, result, _ in self._pending if self._owns_lease(job_id)]
+        self._pending = []
+        if not owned:
+            return
+        name = f"{self.worker_id}-{os.getpid()}-{self._batch_number:06d}.bin"
+        _write_atomic(os.path.join(self.layout.results, name),
+                      encode_results([result for _, result in owned]))
+        self._batch_number += 1
+
+        for job_id, _ in owned:
+            _write_atomic(os.path.join(self.layout.done, str(job_id)), b"")
+            self._release(job_id)
+
+    def _owns_lease(self, job_id: int) -> bool:
+        with self._lease_lock:
+            return self._lease_matches(job_id)
+
+    def _lease_matches(self, job_id: int) -> bool:
+        held = self._leases.get(job_id)
+        if held is None:
+            return False
+        try:
+            with open(self.layout.lease_path(job_id), encoding="utf-8") as f:
+                lease = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        return lease["worker"] == self.worker_id and lease["expires"] == held[0]
+
+    def _release(self, job_id: int) -> None:
+        # Чужую аренду той же задачи (после истечения нашей) удалять нельзя
+        with self._lease_lock:
+            if self._lease_matches(job_id):
+                WorkQueue._unlink(self.layout.lease_path(job_id))
+            self._leases.pop(job_id, None)
+
+    def _heartbeat(self, stop: threading.Event) -> None:
+        while not stop.wait(self.poll_interval):
+            self.renew_leases()
+
+    def renew_leases(self, now: Optional[float] = None) -> None:
+        # Аренда продлевается, когда прошла половина срока, поэтому длинные прогоны не отбираются
+        now = time.time() if now is None else now
+        with self._lease_lock:
+            for job_id, (expires, timeout) in list(self._leases.items()):
+                if expires - now > timeout / 2:
+                    continue
+                if not self._lease_matches(job_id):
+                    del self._leases[job_id]
+                    continue
+                expires = now + timeout
+                lease = json.dumps({"worker": self.worker_id, "expires": expires}).encode("utf-8")
+                _write_atomic(self.layout.lease_path(job_id), lease)
+                self._leases[job_id] = (expires, timeout)
+
+    def _acquire(self, job: Dict[str, Any]) -> bool:
+        expires = time.time() + job["lease_timeout"]
+        lease = json.dumps({"worker": self.worker_id, "expires": expires}).encode("utf-8")
+        tmp = os.path.join(self.layout.leases, f".{job['job_id']}.{self.worker_id}.{os.getpid()}.tmp")
+        _write_atomic(tmp, lease)
+        try:
+            # link() атомарен и падает, если аренда уже существует, в том числе на NFS
+            os.link(tmp, self.layout.lease_path(job["job_id"]))
+        except FileExistsError:
+            return False
+        finally:
+            os.unlink(tmp)
+        job["lease_expires"] = expires
+        with self._lease_lock:
+            self._leases[job["job_id"]] = (expires, job["lease_timeout"])
+        return True
+
+
+def _worker_main(directory: str, worker_id: str, batch_size: int) -> None:
+    QueueWorker(directory, worker_id, batch_size).run()
+
+
+def spawn_local_workers(directory: str, count: int, batch_size: int = 16) -> List[Process]:
+    processes = []
+    for index in range(count):
+        process = Process(target=_worker_main, args=(directory, f"{socket.gethostname()}-local{index}", batch_size))
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Распределенная очередь прогонов колонии")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    worker = subparsers.add_parser("worker", help="обрабатывать задачи из очереди")
+    worker.add_argument("directory")
+    worker.add_argument("--id", dest="worker_id")
+    worker.add_argument("--batch-size", type=int, default=16)
+    worker.add_argument("--forever", action="store_true", help="не завершаться, когда очередь пуста")
+
+    status = subparsers.add_parser("status", help="показать состояние очереди")
+    status.add_argument("directory")
+
+    args = parser.parse_args(argv)
+    if args.command == "worker":
+        processed = QueueWorker(args.directory, args.worker_id, args.batch_size).run(not args.forever)
+        print(f"Обработано задач: {processed}")
+    else:
+        queue = WorkQueue(args.directory)
+        queue.reap_expired()
+        print(json.dumps(queue.status(), ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
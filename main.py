@@ -2,6 +2,8 @@ import sys
 import time
 from core.config import SimulationConfig
 from core.colony import AntColony
+from core.dashboard import Dashboard
+from core.interactive import PipelinedRunner
 
 
 def print_welcome(config: SimulationConfig) -> None:
@@ -25,6 +27,24 @@ def print_welcome(config: SimulationConfig) -> None:
     print("=" * 60)
 
 
+def run_interactive(colony: AntColony, colony_name: str, max_days: int) -> AntColony:
+    with PipelinedRunner(colony, max_days) as runner:
+        for report in runner:
+            print(report.output, end="")
+
+            if not report.alive:
+                print(f"\n Колония '{colony_name}' погибла на день {report.day}!")
+                break
+
+            if report.day < max_days:
+                try:
+                    input("\n⏎ Нажмите Enter для следующего дня...")
+                except KeyboardInterrupt:
+                    print("\n\nСимуляция прервана пользователем")
+                    break
+    return runner.shown_colony()
+
+
 def main():
     config = SimulationConfig()
 
@@ -43,6 +63,11 @@ def main():
         auto_mode_input = input("Автоматический режим? (y/n, по умолчанию n): ").strip().lower()
         auto_mode = auto_mode_input == 'y' if auto_mode_input else False
 
+        dashboard_mode = False
+        if auto_mode:
+            dashboard_input = input("Показывать панель мониторинга вместо текстового вывода? (y/n, по умолчанию n): ")
+            dashboard_mode = dashboard_input.strip().lower() == 'y'
+
         detailed_stats_input = input(
             "Показывать детальную статистику смертности? (y/n, по умолчанию y): ").strip().lower()
         config.show_detailed_stats = detailed_stats_input != 'n' if detailed_stats_input else True
@@ -50,26 +75,29 @@ def main():
         print("Неверный формат ввода, использую значения по умолчанию")
         max_days = 30
         auto_mode = False
+        dashboard_mode = False
         config.show_detailed_stats = True
 
     print(f"\nНачинаем симуляцию колонии '{colony_name}' на {max_days} дней...")
     colony = AntColony(colony_name, config)
 
-    for day in range(max_days):
-        colony.simulate_day()
-
+    if dashboard_mode:
+        # Панель перерисовывается с фиксированной частотой, симуляция идет без пауз
+        colony = Dashboard(colony, max_days).run()
         if not colony.is_alive():
             print(f"\n Колония '{colony_name}' погибла на день {colony.day}!")
-            break
+    elif auto_mode:
+        for day in range(max_days):
+            colony.simulate_day()
 
-        if not auto_mode and day < max_days - 1:
-            try:
-                input("\n⏎ Нажмите Enter для следующего дня...")
-            except KeyboardInterrupt:
-                print("\n\nСимуляция прервана пользователем")
+            if not colony.is_alive():
+                print(f"\n Колония '{colony_name}' погибла на день {colony.day}!")
                 break
-        elif auto_mode:
+
             time.sleep(0.5)
+    else:
+        # Следующие дни считаются в фоне, пока пользователь читает текущий
+        colony = run_interactive(colony, colony_name, max_days)
 
     colony.print_final_statistics()
 